@@ -0,0 +1,188 @@
+from strategy.protoss.cannon_rush import CannonRush
+from strategy.protoss.voidray_swarm import VoidRaySwarm
+from strategy.event_log import EventLog, INFO
+
+from bench.fake_game import FakeGame
+from bench.scenarios import SCENARIOS
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+
+STRATEGIES = {
+    'VoidRaySwarm': VoidRaySwarm,
+    'CannonRush': CannonRush,
+}
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+
+
+class Timings():
+    def __init__(self):
+        self.samples = {}
+
+    def add(self, name, seconds):
+        self.samples.setdefault(name, []).append(seconds)
+
+    def wrap(self, name, action):
+        async def timed(*args, **kwargs):
+            start = time.perf_counter()
+            result = await action(*args, **kwargs)
+            self.add(name, time.perf_counter() - start)
+            return result
+        return timed
+
+    def summary(self):
+        result = {}
+        for (name, samples) in self.samples.items():
+            ordered = sorted(samples)
+            result[name] = {
+                'mean_ms': statistics.fmean(ordered) * 1000.0,
+                'p95_ms': ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))] * 1000.0,
+            }
+        return result
+
+
+def instrument(bot, timings):
+    scheduler = getattr(bot, 'scheduler', None)
+    if scheduler is None:
+        # strategies without a scheduler name their own sub-tasks
+        for name in getattr(bot, 'PROFILE_TASKS', ()):
+            setattr(bot, name, timings.wrap(name, getattr(bot, name)))
+        return
+    # run every task on every step so each one gets a full set of samples
+    scheduler.budget = None
+    for task in scheduler.tasks:
+        task.period = 1
+        task.action = timings.wrap(task.name, task.action)
+
+async def play(strategy, scenario, steps, cache_dir, timings=None, allocations=None):
+    with EventLog(os.devnull, level=INFO) as log:
+        bot = STRATEGIES[strategy](log)
+        if hasattr(bot, 'MAP_CACHE_DIR'):
+            bot.MAP_CACHE_DIR = cache_dir
+        game = FakeGame(bot, scenario.game_info_proto())
+        await game.start(scenario.observation(0))
+        if timings is not None:
+            instrument(bot, timings)
+        observations = [scenario.observation(iteration + 1) for iteration in range(steps)]
+        for observation in observations:
+            if allocations is not None:
+                tracemalloc.reset_peak()
+                (before, _) = tracemalloc.get_traced_memory()
+            start = time.perf_counter()
+            await game.step(observation)
+            if timings is not None:
+                timings.add('on_step', time.perf_counter() - start)
+            if allocations is not None:
+                (_, peak) = tracemalloc.get_traced_memory()
+                allocations.append(peak - before)
+        return game.client.requests
+
+def measure(strategy, scenario, steps, warmup, cache_dir):
+    asyncio.run(play(strategy, scenario, warmup, cache_dir))
+    timings = Timings()
+    requests = asyncio.run(play(strategy, scenario, steps, cache_dir, timings=timings))
+    allocations = []
+    tracemalloc.start()
+    try:
+        asyncio.run(play(strategy, scenario, max(1, steps // 4), cache_dir, allocations=allocations))
+    finally:
+        tracemalloc.stop()
+    return {
+        'timings': timings.summary(),
+        'peak_alloc_kb': statistics.fmean(allocations) / 1024.0,
+        'client_requests_per_step': sum(requests.values()) / steps,
+    }
+
+def flatten(results):
+    metrics = {}
+    for (scenario, strategies) in results.items():
+        for (strategy, result) in strategies.items():
+            prefix = '%s/%s' % (scenario, strategy)
+            for (task, timing) in result['timings'].items():
+                metrics['%s/%s/mean_ms' % (prefix, task)] = timing['mean_ms']
+            metrics['%s/peak_alloc_kb' % prefix] = result['peak_alloc_kb']
+            metrics['%s/client_requests_per_step' % prefix] = result['client_requests_per_step']
+    return metrics
+
+def compare(results, baseline, tolerance, noise_floor):
+    regressions = []
+    current = flatten(results)
+    for (key, previous) in flatten(baseline).items():
+        value = current.get(key)
+        if value is None:
+            continue
+        if value > previous * (1.0 + tolerance) and value - previous > noise_floor:
+            regressions.append((key, previous, value))
+    return regressions
+
+def report(results):
+    for (scenario, strategies) in results.items():
+        for (strategy, result) in strategies.items():
+            print('%s / %s: %.2f client requests per step, %.1f KiB peak allocation per step' % (
+                    scenario,
+                    strategy,
+                    result['client_requests_per_step'],
+                    result['peak_alloc_kb']))
+            for (task, timing) in sorted(result['timings'].items(), key=lambda item: -item[1]['mean_ms']):
+                print('    %-20s mean %8.3f ms   p95 %8.3f ms' % (task, timing['mean_ms'], timing['p95_ms']))
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Time strategy steps against synthetic game states')
+    parser.add_argument('--strategies', nargs='+', default=sorted(STRATEGIES.keys()), choices=sorted(STRATEGIES.keys()))
+    parser.add_argument('--scenarios', nargs='+', default=[scenario.name for scenario in SCENARIOS],
+            choices=[scenario.name for scenario in SCENARIOS])
+    parser.add_argument('--steps', type=int, default=40)
+    parser.add_argument('--warmup', type=int, default=5)
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE)
+    parser.add_argument('--save-baseline', action='store_true', help='overwrite the baseline with this run')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='allowed fractional slowdown')
+    parser.add_argument('--noise-floor', type=float, default=0.05, help='ignore differences below this many ms or KiB')
+    parser.add_argument('--output', help='write the raw results to this JSON file')
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    scenarios = {scenario.name: scenario for scenario in SCENARIOS}
+    results = {}
+    # a map cache of its own, so runs neither read nor write the developer's
+    with tempfile.TemporaryDirectory() as cache_dir:
+        for name in args.scenarios:
+            results[name] = {}
+            for strategy in args.strategies:
+                results[name][strategy] = measure(strategy, scenarios[name], args.steps, args.warmup, cache_dir)
+    report(results)
+    if args.output:
+        with open(args.output, 'w') as handle:
+            json.dump(results, handle, indent=2)
+    if args.save_baseline:
+        with open(args.baseline, 'w') as handle:
+            json.dump(results, handle, indent=2, sort_keys=True)
+        print('saved baseline to %s' % args.baseline)
+        return 0
+    if not os.path.exists(args.baseline):
+        # without a baseline there is nothing to gate on, which is a failure too
+        print('no baseline at %s, run with --save-baseline to create one' % args.baseline)
+        return 1
+    with open(args.baseline) as handle:
+        baseline = json.load(handle)
+    regressions = compare(results, baseline, args.tolerance, args.noise_floor)
+    for (key, previous, value) in regressions:
+        print('REGRESSION %s: %.3f -> %.3f (%+.0f%%)' % (key, previous, value, (value / previous - 1.0) * 100.0))
+    if regressions:
+        print('%d benchmark regressions against %s' % (len(regressions), args.baseline))
+        return 1
+    print('no regressions against %s' % args.baseline)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
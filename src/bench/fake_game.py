@@ -0,0 +1,295 @@
+from sc2.data import ActionResult, Race
+from sc2.game_data import GameData
+from sc2.game_info import GameInfo
+from sc2.game_state import GameState
+from sc2.ids.ability_id import AbilityId
+from sc2.ids.unit_typeid import UnitTypeId
+from sc2.unit import UnitGameData
+
+from s2clientprotocol import common_pb2 as common_pb
+from s2clientprotocol import data_pb2 as data_pb
+from s2clientprotocol import raw_pb2 as raw_pb
+from s2clientprotocol import sc2api_pb2 as sc_pb
+
+from collections import Counter
+import numpy as np
+
+
+GROUND = data_pb.Weapon.Ground
+AIR = data_pb.Weapon.Air
+ANY = data_pb.Weapon.Any
+
+STRUCTURE = data_pb.Structure
+ARMORED = data_pb.Armored
+LIGHT = data_pb.Light
+BIOLOGICAL = data_pb.Biological
+MECHANICAL = data_pb.Mechanical
+
+SELF = raw_pb.Self
+ENEMY = raw_pb.Enemy
+NEUTRAL = raw_pb.Neutral
+
+# Just enough of the real unit type data for the strategies in this repo:
+# creation ability, cost, supply, race, attributes, radius, vitals and weapons
+UNIT_SPECS = {
+    UnitTypeId.NEXUS: dict(ability=AbilityId.PROTOSSBUILD_NEXUS, minerals=400, food_provided=15, race=Race.Protoss,
+        attributes=(ARMORED, STRUCTURE), radius=2.75, health=1000, shield=1000),
+    UnitTypeId.PROBE: dict(ability=AbilityId.NEXUSTRAIN_PROBE, minerals=50, food=1, race=Race.Protoss,
+        attributes=(LIGHT, MECHANICAL), radius=0.375, health=20, shield=20, weapons=((GROUND, 5, 1, 0.1, 1.07),)),
+    UnitTypeId.PYLON: dict(ability=AbilityId.PROTOSSBUILD_PYLON, minerals=100, food_provided=8, race=Race.Protoss,
+        attributes=(ARMORED, STRUCTURE), radius=1.125, health=200, shield=200),
+    UnitTypeId.ASSIMILATOR: dict(ability=AbilityId.PROTOSSBUILD_ASSIMILATOR, minerals=75, race=Race.Protoss,
+        attributes=(ARMORED, STRUCTURE), radius=1.75, health=300, shield=300),
+    UnitTypeId.GATEWAY: dict(ability=AbilityId.PROTOSSBUILD_GATEWAY, minerals=150, race=Race.Protoss,
+        attributes=(ARMORED, STRUCTURE), radius=1.75, health=500, shield=500),
+    UnitTypeId.CYBERNETICSCORE: dict(ability=AbilityId.PROTOSSBUILD_CYBERNETICSCORE, minerals=150, race=Race.Protoss,
+        attributes=(ARMORED, STRUCTURE), radius=1.75, health=550, shield=550),
+    UnitTypeId.FORGE: dict(ability=AbilityId.PROTOSSBUILD_FORGE, minerals=150, race=Race.Protoss,
+        attributes=(ARMORED, STRUCTURE), radius=1.75, health=400, shield=400),
+    UnitTypeId.PHOTONCANNON: dict(ability=AbilityId.PROTOSSBUILD_PHOTONCANNON, minerals=150, race=Race.Protoss,
+        attributes=(ARMORED, STRUCTURE), radius=1.125, health=150, shield=150, weapons=((ANY, 20, 1, 7, 0.89),)),
+    UnitTypeId.STARGATE: dict(ability=AbilityId.PROTOSSBUILD_STARGATE, minerals=150, vespene=150, race=Race.Protoss,
+        attributes=(ARMORED, STRUCTURE), radius=1.75, health=600, shield=600),
+    UnitTypeId.ROBOTICSFACILITY: dict(ability=AbilityId.PROTOSSBUILD_ROBOTICSFACILITY, minerals=150, vespene=100,
+        race=Race.Protoss, attributes=(ARMORED, STRUCTURE), radius=1.75, health=450, shield=450),
+    UnitTypeId.VOIDRAY: dict(ability=AbilityId.STARGATETRAIN_VOIDRAY, minerals=250, vespene=150, food=4,
+        race=Race.Protoss, attributes=(ARMORED, MECHANICAL), radius=1.0, health=150, shield=100, flying=True,
+        weapons=((ANY, 6, 1, 6, 0.36),)),
+    UnitTypeId.OBSERVER: dict(ability=AbilityId.ROBOTICSFACILITYTRAIN_OBSERVER, minerals=25, vespene=75, food=1,
+        race=Race.Protoss, attributes=(LIGHT, MECHANICAL), radius=0.5, health=40, shield=20, flying=True),
+    UnitTypeId.STALKER: dict(ability=AbilityId.GATEWAYTRAIN_STALKER, minerals=125, vespene=50, food=2,
+        race=Race.Protoss, attributes=(ARMORED, MECHANICAL), radius=0.625, health=80, shield=80,
+        weapons=((ANY, 13, 1, 6, 1.34),)),
+    UnitTypeId.HATCHERY: dict(ability=AbilityId.ZERGBUILD_HATCHERY, minerals=300, food_provided=6, race=Race.Zerg,
+        attributes=(ARMORED, BIOLOGICAL, STRUCTURE), radius=2.75, health=1500),
+    UnitTypeId.SPINECRAWLER: dict(ability=AbilityId.ZERGBUILD_SPINECRAWLER, minerals=100, race=Race.Zerg,
+        attributes=(ARMORED, BIOLOGICAL, STRUCTURE), radius=1.0, health=300, weapons=((GROUND, 25, 1, 7, 1.32),)),
+    UnitTypeId.DRONE: dict(ability=AbilityId.LARVATRAIN_DRONE, minerals=50, food=1, race=Race.Zerg,
+        attributes=(LIGHT, BIOLOGICAL), radius=0.375, health=40, weapons=((GROUND, 5, 1, 0.1, 1.07),)),
+    UnitTypeId.ZERGLING: dict(ability=AbilityId.LARVATRAIN_ZERGLING, minerals=25, food=0.5, race=Race.Zerg,
+        attributes=(LIGHT, BIOLOGICAL), radius=0.375, health=35, weapons=((GROUND, 5, 1, 0.1, 0.497),)),
+    UnitTypeId.ROACH: dict(ability=AbilityId.LARVATRAIN_ROACH, minerals=75, vespene=25, food=2, race=Race.Zerg,
+        attributes=(ARMORED, BIOLOGICAL), radius=0.625, health=145, weapons=((GROUND, 16, 1, 4, 1.43),)),
+    UnitTypeId.MUTALISK: dict(ability=AbilityId.LARVATRAIN_MUTALISK, minerals=100, vespene=100, food=2,
+        race=Race.Zerg, attributes=(LIGHT, BIOLOGICAL), radius=0.5, health=120, flying=True,
+        weapons=((ANY, 9, 1, 3, 1.09),)),
+    UnitTypeId.OVERLORD: dict(ability=AbilityId.LARVATRAIN_OVERLORD, minerals=100, food_provided=8, race=Race.Zerg,
+        attributes=(ARMORED, BIOLOGICAL), radius=1.0, health=200, flying=True),
+    UnitTypeId.MINERALFIELD: dict(race=Race.NoRace, attributes=(STRUCTURE,), radius=1.125, has_minerals=True),
+    UnitTypeId.VESPENEGEYSER: dict(race=Race.NoRace, attributes=(STRUCTURE,), radius=1.75, has_vespene=True),
+}
+
+GAME_LOOPS_PER_STEP = 8
+
+
+def spec_of(type_id):
+    return UNIT_SPECS[type_id]
+
+def make_game_data_proto():
+    abilities = [
+        data_pb.AbilityData(ability_id=ability.value, link_name=ability.name.title(), available=True)
+        for ability in AbilityId
+        if ability.value != 0
+    ]
+    units = []
+    for (type_id, spec) in UNIT_SPECS.items():
+        units.append(data_pb.UnitTypeData(
+                unit_id=type_id.value,
+                name=type_id.name.title(),
+                available=True,
+                mineral_cost=spec.get('minerals', 0),
+                vespene_cost=spec.get('vespene', 0),
+                food_required=spec.get('food', 0),
+                food_provided=spec.get('food_provided', 0),
+                ability_id=spec['ability'].value if 'ability' in spec else 0,
+                race=spec['race'].value,
+                has_minerals=spec.get('has_minerals', False),
+                has_vespene=spec.get('has_vespene', False),
+                attributes=spec['attributes'],
+                weapons=[
+                    data_pb.Weapon(type=kind, damage=damage, attacks=attacks, range=reach, speed=speed)
+                    for (kind, damage, attacks, reach, speed) in spec.get('weapons', ())
+                ]))
+    return sc_pb.ResponseData(abilities=abilities, units=units)
+
+def image(grid, in_bits):
+    (height, width) = grid.shape
+    if in_bits:
+        data = np.packbits(grid.astype(np.uint8).reshape(-1)).tobytes()
+        bits = 1
+    else:
+        data = grid.astype(np.uint8).tobytes()
+        bits = 8
+    return common_pb.ImageData(bits_per_pixel=bits, size=common_pb.Size2DI(x=width, y=height), data=data)
+
+def make_game_info_proto(map_name, map_size, start_locations, pathable=None, own_race=Race.Protoss, enemy_race=Race.Zerg):
+    (width, height) = map_size
+    if pathable is None:
+        # open map with an unpathable border, like the playable area of a real map
+        pathable = np.zeros((height, width), dtype=bool)
+        pathable[2:height - 2, 2:width - 2] = True
+    terrain = np.full((height, width), 128, dtype=np.uint8)
+    start_raw = raw_pb.StartRaw(
+            map_size=common_pb.Size2DI(x=width, y=height),
+            pathing_grid=image(pathable, True),
+            placement_grid=image(pathable, True),
+            terrain_height=image(terrain, False),
+            playable_area=common_pb.RectangleI(
+                p0=common_pb.PointI(x=2, y=2),
+                p1=common_pb.PointI(x=width - 2, y=height - 2)),
+            start_locations=[common_pb.Point2D(x=x, y=y) for (x, y) in start_locations])
+    return sc_pb.ResponseGameInfo(
+            map_name=map_name,
+            start_raw=start_raw,
+            player_info=[
+                sc_pb.PlayerInfo(player_id=1, type=sc_pb.Participant, race_requested=own_race.value,
+                    race_actual=own_race.value),
+                sc_pb.PlayerInfo(player_id=2, type=sc_pb.Computer, race_requested=enemy_race.value,
+                    race_actual=enemy_race.value, difficulty=sc_pb.Hard),
+            ])
+
+def make_unit(tag, type_id, alliance, x, y, build_progress=1.0, orders=(), health=None, contents=0):
+    spec = spec_of(type_id)
+    owner = {SELF: 1, ENEMY: 2}.get(alliance, 16)
+    unit = raw_pb.Unit(
+            display_type=raw_pb.Visible,
+            alliance=alliance,
+            tag=tag,
+            unit_type=type_id.value,
+            owner=owner,
+            pos=common_pb.Point(x=x, y=y, z=10.0),
+            radius=spec['radius'],
+            build_progress=build_progress,
+            cloak=raw_pb.NotCloaked,
+            is_flying=spec.get('flying', False),
+            health=spec.get('health', 0) if health is None else health,
+            health_max=spec.get('health', 0),
+            shield=spec.get('shield', 0),
+            shield_max=spec.get('shield', 0))
+    if spec.get('has_minerals'):
+        unit.mineral_contents = contents
+    if spec.get('has_vespene'):
+        unit.vespene_contents = contents
+    for (ability, target) in orders:
+        order = unit.orders.add(ability_id=ability.value, progress=0.0)
+        if isinstance(target, int):
+            order.target_unit_tag = target
+        elif target is not None:
+            order.target_world_space_pos.x = target[0]
+            order.target_world_space_pos.y = target[1]
+    return unit
+
+def make_observation(units, game_loop, minerals=0, vespene=0, food_used=0, food_cap=0, dead_units=(), power_sources=(),
+        creep=None):
+    response = sc_pb.ResponseObservation()
+    observation = response.observation
+    observation.game_loop = game_loop
+    common = observation.player_common
+    common.player_id = 1
+    common.minerals = minerals
+    common.vespene = vespene
+    common.food_used = food_used
+    common.food_cap = food_cap
+    raw = observation.raw_data
+    raw.units.extend(units)
+    raw.event.dead_units.extend(dead_units)
+    for (tag, x, y, radius) in power_sources:
+        raw.player.power_sources.add(pos=common_pb.Point(x=x, y=y, z=10.0), radius=radius, tag=tag)
+    if creep is not None:
+        raw.map_state.creep.CopyFrom(image(creep, True))
+    return response
+
+
+class FakeClient():
+    def __init__(self, game_info, game_info_proto, game_data_proto):
+        self.game_info = game_info
+        self.game_info_proto = game_info_proto
+        self.game_data_proto = game_data_proto
+        self.in_game = True
+        self.requests = Counter()
+        self.sent = []
+
+    async def _execute(self, **kwargs):
+        (request, _) = kwargs.popitem()
+        self.requests[request] += 1
+        if request == 'data':
+            return sc_pb.Response(data=self.game_data_proto)
+        if request == 'game_info':
+            return sc_pb.Response(game_info=self.game_info_proto)
+        raise NotImplementedError(request)
+
+    async def actions(self, actions, return_successes=False):
+        if not isinstance(actions, list):
+            actions = [actions]
+        self.requests['actions'] += 1
+        self.sent.extend(actions)
+        if return_successes:
+            return [ActionResult.Success for _ in actions]
+        return []
+
+    def placeable(self, position):
+        x = int(round(position[0]))
+        y = int(round(position[1]))
+        grid = self.game_info.placement_grid
+        return 0 <= x < grid.width and 0 <= y < grid.height and grid[(x, y)] != 0
+
+    async def query_building_placement(self, ability, positions, ignore_resources=True):
+        self.requests['query_building_placement'] += 1
+        return [
+            ActionResult.Success if self.placeable(position) else ActionResult.CantBuildLocationInvalid
+            for position in positions
+        ]
+
+    async def query_pathing(self, start, end):
+        self.requests['query_pathing'] += 1
+        return start.position.distance_to(end)
+
+    async def query_pathings(self, zipped_list):
+        self.requests['query_pathings'] += 1
+        return [start.position.distance_to(end) for (start, end) in zipped_list]
+
+    async def query_available_abilities(self, units, ignore_resource_requirements=False):
+        self.requests['query_available_abilities'] += 1
+        return [[] for _ in units]
+
+    async def chat_send(self, message, team_only):
+        self.requests['chat_send'] += 1
+
+    def take_sent(self):
+        sent = self.sent
+        self.sent = []
+        return sent
+
+
+class FakeGame():
+    def __init__(self, bot, game_info_proto, game_data_proto=None, player_id=1):
+        self.bot = bot
+        self.game_info_proto = game_info_proto
+        self.proto_game_info = sc_pb.Response(game_info=game_info_proto)
+        if game_data_proto is None:
+            game_data_proto = make_game_data_proto()
+        self.game_data = GameData(game_data_proto)
+        self.game_info = GameInfo(game_info_proto)
+        self.client = FakeClient(self.game_info, game_info_proto, game_data_proto)
+        self.player_id = player_id
+        self.iteration = 0
+
+    def prepare(self, response_observation):
+        state = GameState(response_observation)
+        self.bot._prepare_step(state, self.proto_game_info)
+        return state
+
+    async def start(self, response_observation):
+        UnitGameData._game_data = self.game_data
+        UnitGameData._bot_object = self.bot
+        self.bot._prepare_start(self.client, self.player_id, self.game_info, self.game_data)
+        self.prepare(response_observation)
+        self.bot._prepare_first_step()
+        self.bot.on_start()
+        await self.bot.on_start_async()
+
+    async def step(self, response_observation):
+        self.prepare(response_observation)
+        await self.bot.issue_events()
+        await self.bot.on_step(self.iteration)
+        self.iteration += 1
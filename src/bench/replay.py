@@ -0,0 +1,114 @@
+from sc2.unit import Unit
+
+from strategy.event_log import EventLog, INFO
+from strategy.frames import FrameFile
+
+from bench.benchmark import STRATEGIES
+from bench.fake_game import FakeGame
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import sys
+import time
+
+
+GAME_LOOPS_PER_SECOND = 22.4
+
+
+def describe(command):
+    target = command.target
+    if isinstance(target, Unit):
+        target = target.tag
+    elif target is not None:
+        target = [round(target[0], 2), round(target[1], 2)]
+    return [command.ability.name, command.unit.tag, target, command.queue]
+
+async def replay(bot, frames, start=0, stop=None):
+    stop = len(frames) if stop is None else min(stop, len(frames))
+    scheduler = getattr(bot, 'scheduler', None)
+    if scheduler is not None:
+        # a wall clock budget would make the replayed actions depend on machine load
+        scheduler.budget = None
+    game = FakeGame(bot, frames.game_info, frames.game_data, player_id=frames.player_id)
+    await game.start(frames[start].observation())
+    steps = []
+    for index in range(start, stop):
+        frame = frames[index]
+        began = time.perf_counter()
+        observation = frame.observation()
+        decoded = time.perf_counter()
+        await game.step(observation)
+        finished = time.perf_counter()
+        steps.append({
+            'game_loop': frame.game_loop,
+            'decode': decoded - began,
+            'on_step': finished - decoded,
+            'actions': [describe(command) for command in game.client.take_sent()],
+        })
+    return steps
+
+def diverged(steps, expected):
+    for (step, previous) in zip(steps, expected):
+        if step['actions'] != previous['actions']:
+            return step['game_loop']
+    if len(steps) != len(expected):
+        return 'length'
+    return None
+
+def report(steps):
+    if len(steps) == 0:
+        print('no frames replayed')
+        return
+    on_step = sorted(step['on_step'] for step in steps)
+    decode = statistics.fmean(step['decode'] for step in steps)
+    wall = sum(on_step) + decode * len(steps)
+    game_seconds = (steps[-1]['game_loop'] - steps[0]['game_loop']) / GAME_LOOPS_PER_SECOND
+    print('%d frames, game loops %d-%d' % (len(steps), steps[0]['game_loop'], steps[-1]['game_loop']))
+    print('decode   mean %8.3f ms' % (decode * 1000.0))
+    print('on_step  mean %8.3f ms   p95 %8.3f ms   max %8.3f ms' % (
+            statistics.fmean(on_step) * 1000.0,
+            on_step[min(len(on_step) - 1, int(0.95 * len(on_step)))] * 1000.0,
+            on_step[-1] * 1000.0))
+    if wall > 0:
+        print('%.1fx real time' % (game_seconds / wall))
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Feed recorded observation frames back into a strategy without SC2')
+    parser.add_argument('frames', help='frame file written by ObservationRecorder')
+    parser.add_argument('--strategy', default='VoidRaySwarm', choices=sorted(STRATEGIES.keys()))
+    parser.add_argument('--start', type=int, default=0, help='first frame to replay')
+    parser.add_argument('--stop', type=int, default=None, help='frame to stop before')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--save-actions', help='write the actions issued on every step to this JSONL file')
+    parser.add_argument('--expect-actions', help='fail unless the actions match this JSONL file')
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    random.seed(args.seed)
+    frames = FrameFile(args.frames)
+    with EventLog(os.devnull, level=INFO) as log:
+        bot = STRATEGIES[args.strategy](log)
+        steps = asyncio.run(replay(bot, frames, args.start, args.stop))
+    report(steps)
+    if args.save_actions:
+        with open(args.save_actions, 'w') as handle:
+            for step in steps:
+                print(json.dumps({'game_loop': step['game_loop'], 'actions': step['actions']}), file=handle)
+    if args.expect_actions:
+        with open(args.expect_actions) as handle:
+            expected = [json.loads(line) for line in handle]
+        where = diverged(steps, expected)
+        if where is not None:
+            print('actions diverge from %s at game loop %s' % (args.expect_actions, where))
+            return 1
+        print('actions match %s' % args.expect_actions)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,177 @@
+from sc2.ids.ability_id import AbilityId
+from sc2.ids.unit_typeid import UnitTypeId
+
+from bench.fake_game import SELF, ENEMY, NEUTRAL, GAME_LOOPS_PER_STEP
+from bench.fake_game import make_game_info_proto, make_observation, make_unit, spec_of
+
+import math
+import numpy as np
+
+
+MAP_SIZE = (200, 176)
+OWN_START = (40.5, 40.5)
+ENEMY_START = (160.5, 136.5)
+OWN_BASES = [OWN_START, (40.5, 84.5), (84.5, 40.5), (84.5, 84.5), (128.5, 40.5)]
+ENEMY_BASES = [ENEMY_START, (160.5, 92.5), (116.5, 136.5), (116.5, 92.5), (72.5, 136.5)]
+PHASES = {
+    'early': dict(minerals=400, vespene=100, game_loop=4000),
+    'late': dict(minerals=3000, vespene=2000, game_loop=24000),
+}
+ARMY_TYPES = [UnitTypeId.VOIDRAY, UnitTypeId.STALKER]
+ENEMY_TYPES = [UnitTypeId.ZERGLING, UnitTypeId.ROACH, UnitTypeId.MUTALISK]
+MOBILE = {
+    UnitTypeId.PROBE, UnitTypeId.VOIDRAY, UnitTypeId.STALKER, UnitTypeId.OBSERVER,
+    UnitTypeId.ZERGLING, UnitTypeId.ROACH, UnitTypeId.MUTALISK, UnitTypeId.DRONE, UnitTypeId.OVERLORD,
+}
+
+
+class Record():
+    def __init__(self, tag, type_id, alliance, x, y, orders=(), contents=0, build_progress=1.0):
+        self.tag = tag
+        self.type_id = type_id
+        self.alliance = alliance
+        self.x = x
+        self.y = y
+        self.orders = orders
+        self.contents = contents
+        self.build_progress = build_progress
+
+
+class Scenario():
+    def __init__(self, name, army, enemies, observers, bases, phase='late', seed=0, creep=0, rush=False):
+        self.name = name
+        self.army = army
+        self.enemies = enemies
+        self.observers = observers
+        self.bases = bases
+        self.phase = phase
+        self.seed = seed
+        # creep radius around every hatchery, none when zero
+        self.creep = creep
+        # a cannon rush under way at the enemy start
+        self.rush = rush
+        self.next_tag = 1
+        self.records = []
+        self.creep_grid = None
+        self.populate()
+
+    def add(self, type_id, alliance, x, y, **kwargs):
+        record = Record(self.next_tag, type_id, alliance, x, y, **kwargs)
+        self.next_tag += 1
+        self.records.append(record)
+        return record
+
+    def add_resources(self, centre):
+        minerals = []
+        for index in range(8):
+            angle = math.pi * (0.75 + index * 0.5 / 7)
+            minerals.append(self.add(UnitTypeId.MINERALFIELD, NEUTRAL,
+                    centre[0] + 7 * math.cos(angle), centre[1] + 7 * math.sin(angle), contents=1500))
+        # geysers at either end of the mineral line, close enough to be grouped into the same expansion
+        geysers = [
+            self.add(UnitTypeId.VESPENEGEYSER, NEUTRAL,
+                    centre[0] + 7 * math.cos(angle), centre[1] + 7 * math.sin(angle), contents=2250)
+            for angle in (math.pi * 0.55, math.pi * 1.45)
+        ]
+        return (minerals, geysers)
+
+    def populate(self):
+        rng = np.random.default_rng(self.seed)
+        for (index, centre) in enumerate(OWN_BASES[:self.bases]):
+            (minerals, geysers) = self.add_resources(centre)
+            self.add(UnitTypeId.NEXUS, SELF, centre[0], centre[1])
+            self.add(UnitTypeId.ASSIMILATOR, SELF, geysers[0].x, geysers[0].y)
+            self.add(UnitTypeId.PYLON, SELF, centre[0] + 5, centre[1] - 6)
+            self.add(UnitTypeId.PYLON, SELF, centre[0] - 6, centre[1] + 5)
+            for worker in range(16):
+                mineral = minerals[worker % len(minerals)]
+                self.add(UnitTypeId.PROBE, SELF,
+                        centre[0] + rng.uniform(-5, 5), centre[1] + rng.uniform(-5, 5),
+                        orders=((AbilityId.HARVEST_GATHER, mineral.tag),))
+            self.add(UnitTypeId.STARGATE, SELF, centre[0] + 8, centre[1] - 10)
+            if index == 0:
+                self.add(UnitTypeId.GATEWAY, SELF, centre[0] + 10, centre[1] - 4)
+                self.add(UnitTypeId.CYBERNETICSCORE, SELF, centre[0] - 4, centre[1] + 10)
+                self.add(UnitTypeId.ROBOTICSFACILITY, SELF, centre[0] - 10, centre[1] + 4)
+        rally = (OWN_START[0] + 20, OWN_START[1] + 20)
+        for index in range(self.army):
+            orders = ()
+            if index % 2 == 1:
+                orders = ((AbilityId.ATTACK, ENEMY_START),)
+            self.add(ARMY_TYPES[index % len(ARMY_TYPES)], SELF,
+                    rally[0] + rng.normal(0, 6), rally[1] + rng.normal(0, 6), orders=orders)
+        for index in range(self.observers):
+            self.add(UnitTypeId.OBSERVER, SELF, rng.uniform(10, MAP_SIZE[0] - 10), rng.uniform(10, MAP_SIZE[1] - 10))
+        for centre in ENEMY_BASES[:max(1, min(self.bases, len(ENEMY_BASES)))]:
+            self.add_resources(centre)
+            self.add(UnitTypeId.HATCHERY, ENEMY, centre[0], centre[1])
+        for index in range(self.enemies):
+            # most of the swarm sits at home, the rest is pushing into our main
+            if index % 10 < 7:
+                centre = ENEMY_START
+            else:
+                centre = (OWN_START[0] + 25, OWN_START[1] + 10)
+            self.add(ENEMY_TYPES[index % len(ENEMY_TYPES)], ENEMY,
+                    centre[0] + rng.normal(0, 8), centre[1] + rng.normal(0, 8))
+        if self.rush:
+            self.add(UnitTypeId.FORGE, SELF, OWN_START[0] + 10, OWN_START[1] + 4)
+            # just off the creep, on the way in from the map centre
+            self.add(UnitTypeId.PYLON, SELF, ENEMY_START[0] - 12, ENEMY_START[1] - 12)
+            self.add(UnitTypeId.PHOTONCANNON, SELF, ENEMY_START[0] - 14, ENEMY_START[1] - 12)
+        if self.creep > 0:
+            (ys, xs) = np.mgrid[0:MAP_SIZE[1], 0:MAP_SIZE[0]]
+            self.creep_grid = np.zeros((MAP_SIZE[1], MAP_SIZE[0]), dtype=bool)
+            for record in self.records:
+                if record.type_id == UnitTypeId.HATCHERY:
+                    self.creep_grid |= np.hypot(xs + 0.5 - record.x, ys + 0.5 - record.y) <= self.creep
+
+    def game_info_proto(self):
+        return make_game_info_proto(self.name, MAP_SIZE, [ENEMY_START])
+
+    def supply(self):
+        used = 0
+        cap = 0
+        for record in self.records:
+            if record.alliance == SELF:
+                spec = spec_of(record.type_id)
+                used += spec.get('food', 0)
+                cap += spec.get('food_provided', 0)
+        return (int(math.ceil(used)), min(200, cap))
+
+    def observation(self, iteration):
+        rng = np.random.default_rng(self.seed * 7919 + iteration)
+        jitter = rng.normal(0, 0.5, size=(len(self.records), 2))
+        units = []
+        power_sources = []
+        for (record, (dx, dy)) in zip(self.records, jitter):
+            (x, y) = (record.x, record.y)
+            if iteration > 0 and record.type_id in MOBILE:
+                x = min(max(x + dx, 3.0), MAP_SIZE[0] - 3.0)
+                y = min(max(y + dy, 3.0), MAP_SIZE[1] - 3.0)
+            units.append(make_unit(record.tag, record.type_id, record.alliance, x, y,
+                    build_progress=record.build_progress,
+                    orders=record.orders,
+                    contents=record.contents))
+            if record.type_id == UnitTypeId.PYLON and record.alliance == SELF:
+                power_sources.append((record.tag, x, y, 6.5))
+        (food_used, food_cap) = self.supply()
+        phase = PHASES[self.phase]
+        return make_observation(
+                units,
+                game_loop=phase['game_loop'] + iteration * GAME_LOOPS_PER_STEP,
+                minerals=phase['minerals'],
+                vespene=phase['vespene'],
+                food_used=food_used,
+                food_cap=food_cap,
+                power_sources=power_sources,
+                creep=self.creep_grid)
+
+
+SCENARIOS = [
+    Scenario('early-10v10', army=10, enemies=10, observers=1, bases=1, phase='early'),
+    Scenario('mid-100v100', army=100, enemies=100, observers=4, bases=3, phase='late'),
+    Scenario('late-500v500', army=500, enemies=500, observers=4, bases=5, phase='late'),
+    Scenario('late-100v1000', army=100, enemies=1000, observers=4, bases=5, phase='late'),
+    Scenario('observers-50v50', army=50, enemies=50, observers=40, bases=3, phase='late'),
+    Scenario('rush-creep', army=0, enemies=10, observers=0, bases=1, phase='late', creep=12, rush=True),
+]
@@ -0,0 +1,160 @@
+from s2clientprotocol import sc2api_pb2 as sc_pb
+from sc2.data import Result, Status
+from sc2.sc2process import SC2Process
+
+from bench.fake_game import make_game_data_proto
+from bench.scenarios import SCENARIOS
+
+from aiohttp import web
+import argparse
+import asyncio
+import math
+import subprocess
+import sys
+import time
+
+
+SCENARIO_NAMES = {scenario.name: scenario for scenario in SCENARIOS}
+
+
+class StandInProcess(SC2Process):
+    # launches this module in place of the game, same protocol and port handling
+    def __init__(self, *args, stand_in_args=(), **kwargs):
+        super().__init__(*args, **kwargs)
+        self.stand_in_args = list(stand_in_args)
+
+    def _launch(self):
+        return subprocess.Popen(
+                [sys.executable, '-m', 'bench.stand_in', '--listen', self._host, '--port', str(self._port)]
+                + self.stand_in_args)
+
+
+class StandInGame():
+    # answers the requests python-sc2 makes over the SC2 API websocket, from a
+    # bench scenario instead of a real game, for exercising the launcher
+    def __init__(self, scenario, game_steps, create_delay=0.0):
+        self.scenario = scenario
+        self.game_steps = game_steps
+        self.create_delay = create_delay
+        self.status = Status.launched
+        self.steps = 0
+        self.games = 0
+        self.realtime = False
+        self.game_data = make_game_data_proto()
+        self.game_info = scenario.game_info_proto()
+
+    def answer(self, request):
+        kind = request.WhichOneof('request')
+        response = sc_pb.Response()
+        handler = getattr(self, 'on_' + kind, None)
+        if handler is None:
+            # acknowledged with an empty answer of the right kind
+            getattr(response, kind).SetInParent()
+        else:
+            handler(request, response)
+        response.status = self.status.value
+        return response
+
+    def on_ping(self, request, response):
+        response.ping.game_version = 'stand-in'
+        response.ping.data_version = 'stand-in'
+
+    def on_create_game(self, request, response):
+        if self.status != Status.launched:
+            response.create_game.error = sc_pb.ResponseCreateGame.InvalidMapPath
+            response.create_game.error_details = 'game already in progress'
+            return
+        # stands in for the map load a real instance does on every game
+        time.sleep(self.create_delay)
+        response.create_game.SetInParent()
+        self.realtime = request.create_game.realtime
+        self.status = Status.init_game
+
+    def on_join_game(self, request, response):
+        response.join_game.player_id = 1
+        self.status = Status.in_game
+        self.steps = 0
+        self.games += 1
+
+    def on_data(self, request, response):
+        response.data.CopyFrom(self.game_data)
+
+    def on_game_info(self, request, response):
+        response.game_info.CopyFrom(self.game_info)
+
+    def on_observation(self, request, response):
+        response.observation.CopyFrom(self.scenario.observation(self.steps))
+        if self.steps >= self.game_steps:
+            self.status = Status.ended
+            response.observation.player_result.add(player_id=1, result=Result.Victory.value)
+            response.observation.player_result.add(player_id=2, result=Result.Defeat.value)
+        elif self.realtime:
+            # nobody sends step in real time, the game clock runs on its own
+            self.steps += 1
+
+    def on_step(self, request, response):
+        self.steps += 1
+        response.step.simulation_loop = self.steps
+
+    def on_action(self, request, response):
+        response.action.result.extend([1] * len(request.action.actions))
+
+    def on_query(self, request, response):
+        for pathing in request.query.pathing:
+            start = pathing.start_pos
+            end = pathing.end_pos
+            response.query.pathing.add(distance=math.hypot(end.x - start.x, end.y - start.y))
+        for placement in request.query.placements:
+            response.query.placements.add(result=1)
+
+    def on_save_replay(self, request, response):
+        response.save_replay.data = b'stand-in replay %d' % self.games
+
+    def on_leave_game(self, request, response):
+        response.leave_game.SetInParent()
+        self.status = Status.launched
+
+    def on_quit(self, request, response):
+        response.quit.SetInParent()
+        self.status = Status.quit
+
+
+async def serve(game, host, port):
+    stopped = asyncio.Event()
+    async def sc2api(request):
+        socket = web.WebSocketResponse(max_msg_size=0)
+        await socket.prepare(request)
+        async for message in socket:
+            response = game.answer(sc_pb.Request.FromString(message.data))
+            await socket.send_bytes(response.SerializeToString())
+            if game.status == Status.quit:
+                stopped.set()
+                break
+        return socket
+    application = web.Application()
+    application.router.add_get('/sc2api', sc2api)
+    runner = web.AppRunner(application)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    await stopped.wait()
+    await runner.cleanup()
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Serve the SC2 API from a bench scenario')
+    parser.add_argument('--listen', default='127.0.0.1')
+    parser.add_argument('--port', type=int, required=True)
+    parser.add_argument('--scenario', default='early-10v10', choices=sorted(SCENARIO_NAMES))
+    parser.add_argument('--game-steps', type=int, default=20, help='steps before each game ends')
+    parser.add_argument('--launch-delay', type=float, default=0.0, help='seconds to stand in for the process start up')
+    parser.add_argument('--create-delay', type=float, default=0.0, help='seconds to stand in for each map load')
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    time.sleep(args.launch_delay)
+    game = StandInGame(SCENARIO_NAMES[args.scenario], args.game_steps, create_delay=args.create_delay)
+    asyncio.run(serve(game, args.listen, args.port))
+
+
+if __name__ == '__main__':
+    main()
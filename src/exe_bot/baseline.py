@@ -1,23 +1,105 @@
 import sc2
-from sc2 import run_game, maps, Race, Difficulty
+from sc2 import maps, Race, Difficulty
 from sc2.player import Bot, Computer
 
 from strategy.protoss.cannon_rush import CannonRush
 from strategy.protoss.voidray_swarm import VoidRaySwarm
+from strategy.event_log import EventLog
+from strategy.frames import ObservationRecorder
+from strategy.profiling import StepProfiler
 
+from exe_bot.history import DEFAULT_HISTORY_PATH, MatchHistory, StrategySelector, opponent_name
+from exe_bot.instance_pool import InstancePool
+
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import nullcontext
 from datetime import datetime
+import argparse
+import asyncio
+
+
+STRATEGIES = {
+    'VoidRaySwarm': VoidRaySwarm,
+    'CannonRush': CannonRush,
+}
+
+POOLS = {
+    'thread': ThreadPoolExecutor,
+    'process': ProcessPoolExecutor,
+}
+
+MAP_NAME = 'AbyssalReefLE'
+OPPONENT_RACE = Race.Zerg
+OPPONENT_DIFFICULTY = Difficulty.Hard
+GAME_LOOPS_PER_SECOND = 22.4
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Play games against the built in AI')
+    parser.add_argument('--games', type=int, default=1, help='games to play back to back on one warm instance')
+    parser.add_argument('--realtime', action='store_true',
+            help='play in real time, with heavy planning moved off the game loop')
+    parser.add_argument('--planner', choices=sorted(POOLS), default='thread',
+            help='pool that plans in realtime games')
+    parser.add_argument('--planner-workers', type=int, default=2)
+    parser.add_argument('--strategy', choices=sorted(STRATEGIES), default=None,
+            help='play this strategy instead of picking one from the match history')
+    parser.add_argument('--history', default=DEFAULT_HISTORY_PATH)
+    parser.add_argument('--record', action='store_true', help='write the observation frames of every game')
+    return parser.parse_args()
+
+async def play(pool, args, executor):
+    # the strategy is picked from the past results against this opponent
+    opponent = opponent_name(OPPONENT_RACE.name, OPPONENT_DIFFICULTY.name)
+    strategy = args.strategy
+    if strategy is None:
+        with MatchHistory(args.history) as history:
+            strategy = StrategySelector(history, STRATEGIES).select(opponent, OPPONENT_RACE.name, MAP_NAME)
+    basename = datetime.now().strftime('baseline-%Y%m%dT%H%M%S')
+    replay_filename = basename + '.SC2Replay'
+    with EventLog(basename + '.events.jsonl.gz') as log, \
+            (ObservationRecorder(basename + '.frames') if args.record else nullcontext()) as recorder, \
+            StepProfiler(basename + '.profile.json') as profiler:
+        if strategy == 'VoidRaySwarm':
+            bot = VoidRaySwarm(log, executor=executor)
+        else:
+            bot = STRATEGIES[strategy](log)
+        if recorder is not None:
+            recorder.attach(bot)
+        async with pool.lease() as instance:
+            result = await instance.play(
+                    maps.get(MAP_NAME),
+                    [
+                        Bot(Race.Protoss, profiler.attach(bot)),
+                        Computer(OPPONENT_RACE, OPPONENT_DIFFICULTY)
+                    ],
+                    realtime=args.realtime,
+                    save_replay_as=replay_filename)
+    state = getattr(bot, 'state', None)
+    step_time = profiler.histograms.get('on_step')
+    with MatchHistory(args.history) as history:
+        history.record(
+                opponent,
+                OPPONENT_RACE.name,
+                MAP_NAME,
+                strategy,
+                result.name if result is not None else None,
+                duration=state.game_loop / GAME_LOOPS_PER_SECOND if state is not None else None,
+                step_time={
+                    'mean': step_time.total / step_time.count / 1000000.0,
+                    'p95': step_time.percentile(0.95) / 1000000.0,
+                    'max': step_time.max / 1000000.0,
+                } if step_time is not None and step_time.count > 0 else None,
+                over_budget=profiler.over_budget)
+    return result
+
+async def main(args):
+    planner = POOLS[args.planner](max_workers=args.planner_workers) if args.realtime else nullcontext()
+    with planner as executor:
+        async with InstancePool(size=1) as pool:
+            for _ in range(args.games):
+                await play(pool, args, executor)
 
 
-# TODO the strategy selection heuristic should be based on historical
-# results against this particular opponent
-basename = datetime.now().strftime('baseline-%Y%m%dT%H%M%S')
-replay_filename = basename + '.SC2Replay'
-with open(basename + '.log', 'w') as handle:
-    run_game(
-            maps.get("AbyssalReefLE"),
-            [
-                Bot(Race.Protoss, VoidRaySwarm(handle)),
-                Computer(Race.Zerg, Difficulty.Hard)
-            ],
-            realtime=False,
-            save_replay_as=replay_filename)
+if __name__ == '__main__':
+    asyncio.run(main(parse_args()))
@@ -0,0 +1,110 @@
+from datetime import datetime
+import math
+import os
+import sqlite3
+
+
+DEFAULT_HISTORY_PATH = os.path.join(os.path.expanduser('~'), '.local', 'share', 't800', 'history.sqlite3')
+
+SCHEMA = [
+    '''CREATE TABLE IF NOT EXISTS matches (
+        id INTEGER PRIMARY KEY,
+        played_at TEXT NOT NULL,
+        opponent TEXT NOT NULL,
+        race TEXT NOT NULL,
+        map TEXT NOT NULL,
+        strategy TEXT NOT NULL,
+        result TEXT,
+        duration REAL,
+        step_mean REAL,
+        step_p95 REAL,
+        step_max REAL,
+        over_budget INTEGER
+    )''',
+    # the selector only ever aggregates one opponent's games, by map and strategy
+    'CREATE INDEX IF NOT EXISTS matches_opponent ON matches (opponent, map, strategy, result)',
+    'CREATE INDEX IF NOT EXISTS matches_race ON matches (race, map, strategy, result)',
+]
+
+def opponent_name(race, difficulty):
+    return 'Computer-%s-%s' % (race, difficulty)
+
+
+class MatchHistory():
+    def __init__(self, path=DEFAULT_HISTORY_PATH):
+        self.path = path
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        # several match runners may append to the same file
+        self.connection = sqlite3.connect(path, timeout=30.0)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        with self.connection:
+            for statement in SCHEMA:
+                self.connection.execute(statement)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def record(self, opponent, race, map_name, strategy, result,
+            duration=None, step_time=None, over_budget=None, played_at=None):
+        # append only, a game is never updated or removed once recorded
+        step_time = step_time or {}
+        with self.connection:
+            self.connection.execute(
+                    'INSERT INTO matches (played_at, opponent, race, map, strategy, result, duration,'
+                    ' step_mean, step_p95, step_max, over_budget) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                    (played_at or datetime.now().isoformat(timespec='seconds'),
+                     opponent, race, map_name, strategy, result, duration,
+                     step_time.get('mean'), step_time.get('p95'), step_time.get('max'), over_budget))
+
+    def tallies(self, column, value, map_name=None):
+        # games and wins per strategy, aggregated inside SQLite off the index
+        query = ('SELECT strategy, COUNT(*), SUM(result = \'Victory\') FROM matches WHERE %s = ?' % column)
+        params = [value]
+        if map_name is not None:
+            query += ' AND map = ?'
+            params.append(map_name)
+        query += ' GROUP BY strategy'
+        return {strategy: (games, wins or 0) for (strategy, games, wins) in self.connection.execute(query, params)}
+
+    def close(self):
+        self.connection.close()
+
+
+class StrategySelector():
+    def __init__(self, history, strategies, exploration=1.0, min_games=3):
+        self.history = history
+        self.strategies = list(strategies)
+        self.exploration = exploration
+        self.min_games = min_games
+
+    def evidence(self, opponent, race, map_name):
+        # the narrowest history with enough games to go on, falling back from
+        # this opponent on this map to this opponent anywhere to the race
+        scopes = [
+            ('opponent', opponent, map_name),
+            ('opponent', opponent, None),
+            ('race', race, map_name),
+            ('race', race, None),
+        ]
+        for (column, value, on_map) in scopes:
+            tallies = self.history.tallies(column, value, on_map)
+            if sum(games for (games, _) in tallies.values()) >= self.min_games:
+                return tallies
+        return tallies
+
+    def select(self, opponent, race, map_name):
+        # UCB1: every strategy is tried once, then the best upper confidence
+        # bound on the win rate is played
+        tallies = self.evidence(opponent, race, map_name)
+        for strategy in self.strategies:
+            if tallies.get(strategy, (0, 0))[0] == 0:
+                return strategy
+        total = sum(tallies[strategy][0] for strategy in self.strategies)
+        def bound(strategy):
+            (games, wins) = tallies[strategy]
+            return wins / games + self.exploration * math.sqrt(2.0 * math.log(total) / games)
+        return max(self.strategies, key=bound)
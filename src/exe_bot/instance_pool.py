@@ -0,0 +1,135 @@
+from s2clientprotocol import sc2api_pb2 as sc_pb
+from sc2.controller import Controller
+from sc2.data import Status
+from sc2.main import _play_game, _setup_host_game
+from sc2.sc2process import SC2Process
+
+from contextlib import asynccontextmanager
+import asyncio
+
+
+class Instance():
+    def __init__(self, make_process):
+        self.make_process = make_process
+        self.process = None
+        self.controller = None
+        self.games = 0
+        self.launches = 0
+
+    async def start(self):
+        # SC2Process as a context manager kills every SC2 process on exit,
+        # so the pool drives its launch and clean up steps itself
+        self.process = self.make_process()
+        try:
+            self.process._process = self.process._launch()
+            self.process._ws = await self.process._connect()
+        except BaseException:
+            await self.stop()
+            raise
+        self.controller = Controller(self.process._ws, self.process)
+        self.games = 0
+        self.launches += 1
+
+    async def stop(self):
+        if self.process is not None:
+            await self.process._close_connection()
+            self.process._clean()
+        self.process = None
+        self.controller = None
+
+    async def restart(self):
+        await self.stop()
+        await self.start()
+
+    def alive(self):
+        return (self.process is not None
+                and self.process._process is not None
+                and self.process._process.poll() is None)
+
+    async def request(self, timeout, **kwargs):
+        try:
+            await asyncio.wait_for(self.controller._execute(**kwargs), timeout)
+        except (Exception, SystemExit):
+            # python-sc2 exits on a closed socket, either way the instance is lost
+            return False
+        return True
+
+    async def reset(self, timeout):
+        # healthy and back in the launched state, ready for the next game
+        if not self.alive() or not await self.request(timeout, ping=sc_pb.RequestPing()):
+            return False
+        if self.controller._status in (Status.in_game, Status.ended):
+            if not await self.request(timeout, leave_game=sc_pb.RequestLeaveGame()):
+                return False
+        return self.controller._status == Status.launched
+
+    async def play(self, map_settings, players, realtime=False, save_replay_as=None,
+            step_time_limit=None, game_time_limit=None):
+        # the body of python-sc2's _host_game, without the process around it
+        self.games += 1
+        client = await _setup_host_game(self.controller, map_settings, players, realtime)
+        result = await _play_game(players[0], client, realtime, None, step_time_limit, game_time_limit)
+        if save_replay_as is not None:
+            await client.save_replay(save_replay_as)
+        await client.leave()
+        return result
+
+
+class InstancePool():
+    def __init__(self, size=1, make_process=SC2Process, max_games=20, health_timeout=10.0):
+        self.size = size
+        self.make_process = make_process
+        # long lived SC2 processes grow, so each is recycled after max_games
+        self.max_games = max_games
+        self.health_timeout = health_timeout
+        self.instances = []
+        self.idle = asyncio.Queue()
+        self.restarts = 0
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
+
+    async def start(self):
+        self.instances = [Instance(self.make_process) for _ in range(self.size)]
+        try:
+            await asyncio.gather(*(instance.start() for instance in self.instances))
+        except BaseException:
+            await self.close()
+            raise
+        for instance in self.instances:
+            self.idle.put_nowait(instance)
+
+    async def ready(self, instance):
+        if instance.games >= self.max_games or not await instance.reset(self.health_timeout):
+            self.restarts += 1
+            await instance.restart()
+        return instance
+
+    async def acquire(self):
+        return await self.ready(await self.idle.get())
+
+    async def release(self, instance):
+        # reset on the way back, so the next lease starts warm
+        try:
+            await self.ready(instance)
+        finally:
+            self.idle.put_nowait(instance)
+
+    @asynccontextmanager
+    async def lease(self):
+        instance = await self.acquire()
+        try:
+            yield instance
+        finally:
+            await self.release(instance)
+
+    async def close(self):
+        for instance in self.instances:
+            if instance.controller is not None and instance.alive():
+                await instance.request(self.health_timeout, quit=sc_pb.RequestQuit())
+            await instance.stop()
+        self.instances = []
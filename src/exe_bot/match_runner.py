@@ -0,0 +1,260 @@
+import sc2
+from sc2 import run_game, maps, Race, Difficulty
+from sc2.player import Bot, Computer
+
+from strategy.protoss.cannon_rush import CannonRush
+from strategy.protoss.voidray_swarm import VoidRaySwarm
+from strategy.event_log import EventLog
+from strategy.frames import ObservationRecorder
+from strategy.profiling import StepProfiler
+
+from exe_bot.history import MatchHistory, opponent_name
+
+from collections import deque
+from contextlib import nullcontext
+from datetime import datetime
+import argparse
+import itertools
+import json
+import multiprocessing
+from multiprocessing.connection import wait
+import os
+import signal
+import statistics
+import time
+import traceback
+
+
+STRATEGIES = {
+    'VoidRaySwarm': VoidRaySwarm,
+    'CannonRush': CannonRush,
+}
+
+GAME_LOOPS_PER_SECOND = 22.4
+
+
+def summarise_step_times(histogram):
+    # the profiler already times every step, in microseconds; reports are in seconds
+    if histogram is None or histogram.count == 0:
+        return {'steps': 0}
+    return {
+        'steps': histogram.count,
+        'mean': histogram.total / histogram.count / 1000000.0,
+        'p50': histogram.percentile(0.50) / 1000000.0,
+        'p95': histogram.percentile(0.95) / 1000000.0,
+        'p99': histogram.percentile(0.99) / 1000000.0,
+        'max': histogram.max / 1000000.0,
+    }
+
+def match_name(match):
+    return '%s-vs-%s-%s-%s-%d' % (
+            match['strategy'],
+            match['race'],
+            match['difficulty'],
+            match['map'],
+            match['game'])
+
+def play_match(match, output_dir, game_time_limit, record, connection):
+    # own process group, so a timeout kill also takes down the SC2 child
+    os.setpgrp()
+    basename = os.path.join(output_dir, match_name(match))
+    report = dict(match)
+    try:
+        with EventLog(basename + '.events.jsonl.gz') as log, \
+                (ObservationRecorder(basename + '.frames') if record else nullcontext()) as recorder, \
+                StepProfiler(basename + '.profile.json') as profiler:
+            bot = STRATEGIES[match['strategy']](log)
+            if recorder is not None:
+                recorder.attach(bot)
+            profiler.attach(bot)
+            result = run_game(
+                    maps.get(match['map']),
+                    [
+                        Bot(Race.Protoss, bot),
+                        Computer(Race[match['race']], Difficulty[match['difficulty']])
+                    ],
+                    realtime=False,
+                    game_time_limit=game_time_limit,
+                    save_replay_as=basename + '.SC2Replay')
+        report['status'] = 'finished'
+        report['result'] = result.name if result is not None else None
+        state = getattr(bot, 'state', None)
+        report['duration'] = state.game_loop / GAME_LOOPS_PER_SECOND if state is not None else None
+        report['step_time'] = summarise_step_times(profiler.histograms.get('on_step'))
+        report['over_budget'] = profiler.over_budget
+    except (Exception, SystemExit):
+        report['status'] = 'crashed'
+        report['error'] = traceback.format_exc()
+    connection.send(report)
+    connection.close()
+
+def build_matrix(strategies, races, difficulties, map_names, games):
+    return [
+        {
+            'strategy': strategy,
+            'race': race,
+            'difficulty': difficulty,
+            'map': map_name,
+            'game': game,
+        }
+        for (strategy, race, difficulty, map_name, game)
+        in itertools.product(strategies, races, difficulties, map_names, range(games))
+    ]
+
+def kill(process):
+    try:
+        os.killpg(process.pid, signal.SIGKILL)
+    except ProcessLookupError:
+        pass
+    process.join()
+
+def run_matrix(matches, workers, timeout, game_time_limit, record, output_dir):
+    pending = deque(matches)
+    running = {}
+    reports = []
+    while pending or running:
+        while pending and len(running) < workers:
+            match = pending.popleft()
+            (receiver, sender) = multiprocessing.Pipe(duplex=False)
+            process = multiprocessing.Process(
+                    target=play_match,
+                    args=(match, output_dir, game_time_limit, record, sender),
+                    name=match_name(match))
+            try:
+                process.start()
+            except BaseException:
+                receiver.close()
+                raise
+            finally:
+                # the child has its own copy, the parent's end would keep the pipe open
+                sender.close()
+            running[receiver] = (process, match, time.monotonic())
+        for receiver in wait(list(running.keys()), timeout=1.0):
+            (process, match, started) = running.pop(receiver)
+            try:
+                report = receiver.recv()
+            except EOFError:
+                process.join()
+                report = dict(match)
+                report['status'] = 'crashed'
+                report['error'] = 'worker exited with code %s' % process.exitcode
+            finally:
+                receiver.close()
+            report['wall_time'] = time.monotonic() - started
+            process.join()
+            reports.append(report)
+            print('%s: %s %s' % (match_name(match), report['status'], report.get('result')))
+        now = time.monotonic()
+        for (receiver, (process, match, started)) in list(running.items()):
+            if now - started > timeout:
+                try:
+                    kill(process)
+                finally:
+                    receiver.close()
+                del running[receiver]
+                report = dict(match)
+                report['status'] = 'timeout'
+                report['wall_time'] = now - started
+                reports.append(report)
+                print('%s: timeout' % match_name(match))
+    return reports
+
+def aggregate(reports):
+    groups = {}
+    for report in reports:
+        key = (report['strategy'], report['race'], report['difficulty'], report['map'])
+        groups.setdefault(key, []).append(report)
+    summary = []
+    for (key, group) in sorted(groups.items()):
+        finished = [report for report in group if report['status'] == 'finished']
+        results = [report['result'] for report in finished]
+        durations = [report['duration'] for report in finished if report.get('duration') is not None]
+        step_means = [report['step_time']['mean'] for report in finished if report['step_time']['steps'] > 0]
+        step_p95s = [report['step_time']['p95'] for report in finished if report['step_time']['steps'] > 0]
+        step_maxes = [report['step_time']['max'] for report in finished if report['step_time']['steps'] > 0]
+        wins = results.count('Victory')
+        summary.append({
+            'strategy': key[0],
+            'race': key[1],
+            'difficulty': key[2],
+            'map': key[3],
+            'games': len(group),
+            'wins': wins,
+            'losses': results.count('Defeat'),
+            'ties': results.count('Tie'),
+            'timeouts': sum(1 for report in group if report['status'] == 'timeout'),
+            'crashes': sum(1 for report in group if report['status'] == 'crashed'),
+            'win_rate': wins / len(finished) if finished else None,
+            'mean_duration': statistics.fmean(durations) if durations else None,
+            'mean_step_time': statistics.fmean(step_means) if step_means else None,
+            'mean_p95_step_time': statistics.fmean(step_p95s) if step_p95s else None,
+            'max_step_time': max(step_maxes) if step_maxes else None,
+        })
+    return summary
+
+def record_history(path, reports):
+    with MatchHistory(path) as history:
+        for report in reports:
+            if report['status'] != 'finished':
+                continue
+            history.record(
+                    opponent_name(report['race'], report['difficulty']),
+                    report['race'],
+                    report['map'],
+                    report['strategy'],
+                    report['result'],
+                    duration=report.get('duration'),
+                    step_time=report.get('step_time'),
+                    over_budget=report.get('over_budget'))
+
+def print_summary(summary):
+    print('%-14s %-8s %-12s %-18s %5s %5s %5s %5s %5s %5s %9s %9s' % (
+            'strategy', 'race', 'difficulty', 'map', 'games', 'wins', 'loss', 'tie', 'tout', 'crash', 'duration', 'step(ms)'))
+    for row in summary:
+        print('%-14s %-8s %-12s %-18s %5d %5d %5d %5d %5d %5d %9s %9s' % (
+                row['strategy'],
+                row['race'],
+                row['difficulty'],
+                row['map'],
+                row['games'],
+                row['wins'],
+                row['losses'],
+                row['ties'],
+                row['timeouts'],
+                row['crashes'],
+                '-' if row['mean_duration'] is None else '%.0f' % row['mean_duration'],
+                '-' if row['mean_step_time'] is None else '%.2f' % (row['mean_step_time'] * 1000.0)))
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Play a matrix of headless games in parallel')
+    parser.add_argument('--strategies', nargs='+', default=sorted(STRATEGIES.keys()), choices=sorted(STRATEGIES.keys()))
+    parser.add_argument('--races', nargs='+', default=['Zerg'], choices=[race.name for race in Race if race != Race.NoRace])
+    parser.add_argument('--difficulties', nargs='+', default=['Hard'], choices=[difficulty.name for difficulty in Difficulty])
+    parser.add_argument('--maps', nargs='+', default=['AbyssalReefLE'])
+    parser.add_argument('--games', type=int, default=1, help='games per combination')
+    parser.add_argument('--workers', type=int, default=max(1, (os.cpu_count() or 2) // 2))
+    parser.add_argument('--timeout', type=float, default=3600.0, help='wall clock seconds before a game is killed')
+    parser.add_argument('--game-time-limit', type=float, default=None, help='in-game seconds before a game is a tie')
+    parser.add_argument('--record', action='store_true', help='write the observation frames of every game')
+    parser.add_argument('--history', default=None, help='append every finished game to this match history')
+    parser.add_argument('--output', default=datetime.now().strftime('matches-%Y%m%dT%H%M%S'))
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    os.makedirs(args.output, exist_ok=True)
+    matches = build_matrix(args.strategies, args.races, args.difficulties, args.maps, args.games)
+    reports = run_matrix(matches, args.workers, args.timeout, args.game_time_limit, args.record, args.output)
+    with open(os.path.join(args.output, 'games.jsonl'), 'w') as handle:
+        for report in reports:
+            print(json.dumps(report), file=handle)
+    if args.history is not None:
+        record_history(args.history, reports)
+    summary = aggregate(reports)
+    with open(os.path.join(args.output, 'summary.json'), 'w') as handle:
+        json.dump(summary, handle, indent=2)
+    print_summary(summary)
+
+
+if __name__ == '__main__':
+    main()
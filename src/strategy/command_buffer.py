@@ -0,0 +1,65 @@
+def same_target(left, right):
+    if left is None or right is None:
+        return left is right
+    left_tag = getattr(left, 'tag', None)
+    right_tag = getattr(right, 'tag', None)
+    if left_tag is not None or right_tag is not None:
+        return left_tag == right_tag
+    return left.x == right.x and left.y == right.y
+
+def same_command(left, right):
+    return (left.ability == right.ability
+            and left.queue == right.queue
+            and same_target(left.target, right.target))
+
+
+class CommandBuffer():
+    def __init__(self, bot, ledger=None):
+        self.bot = bot
+        self.ledger = ledger
+        self.pending = {}
+
+    def __len__(self):
+        return sum(len(commands) for commands in self.pending.values())
+
+    def cost_of(self, command):
+        # keyed on the ability, the command itself would miss the lru cache every time
+        return self.bot._game_data.calculate_ability_cost(command.ability)
+
+    def charge(self, command, sign):
+        cost = self.cost_of(command)
+        self.bot.minerals -= sign * cost.minerals
+        self.bot.vespene -= sign * cost.vespene
+        if self.ledger is not None:
+            if sign > 0:
+                self.ledger.issued(command)
+            else:
+                self.ledger.withdrawn(command)
+
+    def add(self, command):
+        tag = command.unit.tag
+        queued = self.pending.get(tag, [])
+        if any(same_command(command, existing) for existing in queued):
+            return False
+        # a fresh order replaces everything issued earlier in the step
+        superseded = [] if command.queue else queued
+        for previous in superseded:
+            self.charge(previous, -1)
+        cost = self.cost_of(command)
+        if cost.minerals > self.bot.minerals or cost.vespene > self.bot.vespene:
+            for previous in superseded:
+                self.charge(previous, 1)
+            return False
+        if command.queue:
+            self.pending[tag] = queued + [command]
+        else:
+            self.pending[tag] = [command]
+        self.charge(command, 1)
+        return True
+
+    async def flush(self):
+        if not self.pending:
+            return None
+        commands = [command for queued in self.pending.values() for command in queued]
+        self.pending.clear()
+        return await self.bot._client.actions(commands)
@@ -0,0 +1,95 @@
+from collections import deque
+import gzip
+import json
+import threading
+
+
+DEBUG = 10
+INFO = 20
+WARNING = 30
+LEVEL_NAMES = {DEBUG: 'debug', INFO: 'info', WARNING: 'warning'}
+
+
+class EventLog():
+    def __init__(self, path, level=INFO, capacity=65536, flush_interval=0.5):
+        self.path = path
+        self.level = level
+        self.capacity = capacity
+        self.flush_interval = flush_interval
+        # a ring buffer, when the writer falls behind the oldest records go first
+        self.buffer = deque(maxlen=capacity)
+        self.overwritten = 0
+        self.unserialisable = 0
+        self.wakeup = threading.Event()
+        self.closed = False
+        self.handle = gzip.open(path, 'wt', encoding='utf-8')
+        self.writer = threading.Thread(target=self.drain_forever, name='event-log', daemon=True)
+        self.writer.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def enabled(self, level):
+        return level >= self.level
+
+    def record(self, level, kind, iteration, tag=None, position=None, **fields):
+        if level < self.level or self.closed:
+            return
+        if len(self.buffer) >= self.capacity:
+            # never stall the game loop on a slow disk
+            self.overwritten += 1
+        self.buffer.append((iteration, level, kind, tag, position, fields))
+        if len(self.buffer) >= self.capacity // 2:
+            self.wakeup.set()
+
+    def drain(self):
+        written = False
+        while True:
+            try:
+                (iteration, level, kind, tag, position, fields) = self.buffer.popleft()
+            except IndexError:
+                break
+            entry = {'i': iteration, 'lvl': LEVEL_NAMES.get(level, level), 'kind': kind}
+            try:
+                if tag is not None:
+                    entry['tag'] = tag
+                if position is not None:
+                    entry['pos'] = (position[0], position[1])
+                entry.update(fields)
+                line = json.dumps(entry, separators=(',', ':'), default=str)
+            except Exception as error:
+                # one bad record must not end the writer thread and the log with it
+                self.unserialisable += 1
+                line = json.dumps({
+                    'i': iteration,
+                    'lvl': LEVEL_NAMES[WARNING],
+                    'kind': 'unserialisable',
+                    'event': str(kind),
+                    'error': repr(error),
+                }, separators=(',', ':'), default=str)
+            self.handle.write(line)
+            self.handle.write('\n')
+            written = True
+        if written:
+            self.handle.flush()
+
+    def drain_forever(self):
+        while not self.closed:
+            self.wakeup.wait(self.flush_interval)
+            self.wakeup.clear()
+            self.drain()
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        self.wakeup.set()
+        self.writer.join()
+        self.drain()
+        if self.overwritten > 0:
+            self.handle.write(json.dumps({'kind': 'overwritten', 'count': self.overwritten}))
+            self.handle.write('\n')
+        self.handle.close()
@@ -0,0 +1,323 @@
+from s2clientprotocol import common_pb2 as common_pb
+from s2clientprotocol import raw_pb2 as raw_pb
+from s2clientprotocol import sc2api_pb2 as sc_pb
+
+import mmap
+import numpy as np
+import struct
+
+
+MAGIC = b'T800FRM1'
+FILE_HEADER = struct.Struct('<8sIII')
+
+FLYING = 1
+BURROWED = 2
+HALLUCINATION = 4
+POWERED = 8
+ACTIVE = 16
+BLIP = 32
+
+NO_TARGET = 0
+UNIT_TARGET = 1
+POINT_TARGET = 2
+
+FRAME_DTYPE = np.dtype([
+    ('size', '<u4'),
+    ('game_loop', '<u4'),
+    ('minerals', '<u4'),
+    ('vespene', '<u4'),
+    ('food_used', '<u2'),
+    ('food_cap', '<u2'),
+    ('food_army', '<u2'),
+    ('food_workers', '<u2'),
+    ('idle_worker_count', '<u2'),
+    ('army_count', '<u2'),
+    ('warp_gate_count', '<u2'),
+    ('larva_count', '<u2'),
+    ('units', '<u4'),
+    ('orders', '<u4'),
+    ('dead_units', '<u4'),
+    ('power_sources', '<u4'),
+    ('upgrades', '<u4'),
+])
+
+UNIT_DTYPE = np.dtype([
+    ('tag', '<u8'),
+    ('unit_type', '<u4'),
+    ('alliance', 'u1'),
+    ('display_type', 'u1'),
+    ('owner', 'u1'),
+    ('cloak', 'u1'),
+    ('flags', 'u1'),
+    ('assigned_harvesters', 'u1'),
+    ('ideal_harvesters', 'u1'),
+    ('cargo_space_taken', 'u1'),
+    ('cargo_space_max', 'u1'),
+    ('x', '<f4'),
+    ('y', '<f4'),
+    ('z', '<f4'),
+    ('facing', '<f4'),
+    ('radius', '<f4'),
+    ('build_progress', '<f4'),
+    ('health', '<f4'),
+    ('health_max', '<f4'),
+    ('shield', '<f4'),
+    ('shield_max', '<f4'),
+    ('energy', '<f4'),
+    ('energy_max', '<f4'),
+    ('weapon_cooldown', '<f4'),
+    ('mineral_contents', '<u4'),
+    ('vespene_contents', '<u4'),
+    ('add_on_tag', '<u8'),
+    ('engaged_target_tag', '<u8'),
+])
+
+ORDER_DTYPE = np.dtype([
+    ('unit', '<u4'),
+    ('ability_id', '<u4'),
+    ('target', 'u1'),
+    ('target_tag', '<u8'),
+    ('x', '<f4'),
+    ('y', '<f4'),
+    ('progress', '<f4'),
+])
+
+POWER_DTYPE = np.dtype([
+    ('tag', '<u8'),
+    ('x', '<f4'),
+    ('y', '<f4'),
+    ('z', '<f4'),
+    ('radius', '<f4'),
+])
+
+TAG_DTYPE = np.dtype('<u8')
+UPGRADE_DTYPE = np.dtype('<u4')
+
+COMMON_FIELDS = (
+    'minerals', 'vespene', 'food_used', 'food_cap', 'food_army', 'food_workers',
+    'idle_worker_count', 'army_count', 'warp_gate_count', 'larva_count',
+)
+
+# order of the variable length sections after each frame header
+SECTIONS = [
+    ('units', UNIT_DTYPE),
+    ('orders', ORDER_DTYPE),
+    ('dead_units', TAG_DTYPE),
+    ('power_sources', POWER_DTYPE),
+    ('upgrades', UPGRADE_DTYPE),
+]
+
+
+def unit_flags(unit):
+    return ((FLYING if unit.is_flying else 0)
+            | (BURROWED if unit.is_burrowed else 0)
+            | (HALLUCINATION if unit.is_hallucination else 0)
+            | (POWERED if unit.is_powered else 0)
+            | (ACTIVE if unit.is_active else 0)
+            | (BLIP if unit.is_blip else 0))
+
+def order_target(order):
+    if order.HasField('target_unit_tag'):
+        return (UNIT_TARGET, order.target_unit_tag, 0.0, 0.0)
+    if order.HasField('target_world_space_pos'):
+        return (POINT_TARGET, 0, order.target_world_space_pos.x, order.target_world_space_pos.y)
+    return (NO_TARGET, 0, 0.0, 0.0)
+
+def encode(response_observation):
+    observation = response_observation.observation
+    raw = observation.raw_data
+    common = observation.player_common
+    units = []
+    orders = []
+    for (index, unit) in enumerate(raw.units):
+        pos = unit.pos
+        units.append((
+                unit.tag, unit.unit_type, unit.alliance, unit.display_type, unit.owner, unit.cloak, unit_flags(unit),
+                unit.assigned_harvesters, unit.ideal_harvesters, unit.cargo_space_taken, unit.cargo_space_max,
+                pos.x, pos.y, pos.z, unit.facing, unit.radius, unit.build_progress,
+                unit.health, unit.health_max, unit.shield, unit.shield_max, unit.energy, unit.energy_max,
+                unit.weapon_cooldown, unit.mineral_contents, unit.vespene_contents,
+                unit.add_on_tag, unit.engaged_target_tag))
+        for order in unit.orders:
+            (target, target_tag, x, y) = order_target(order)
+            orders.append((index, order.ability_id, target, target_tag, x, y, order.progress))
+    sections = [
+        np.array(units, dtype=UNIT_DTYPE),
+        np.array(orders, dtype=ORDER_DTYPE),
+        np.array(raw.event.dead_units, dtype=TAG_DTYPE),
+        np.array([
+            (source.tag, source.pos.x, source.pos.y, source.pos.z, source.radius)
+            for source in raw.player.power_sources
+        ], dtype=POWER_DTYPE),
+        np.array(raw.player.upgrade_ids, dtype=UPGRADE_DTYPE),
+    ]
+    header = np.zeros(1, dtype=FRAME_DTYPE)
+    header['size'] = FRAME_DTYPE.itemsize + sum(section.nbytes for section in sections)
+    header['game_loop'] = observation.game_loop
+    for name in COMMON_FIELDS:
+        header[name] = getattr(common, name)
+    for ((name, _), section) in zip(SECTIONS, sections):
+        header[name] = len(section)
+    return [header] + sections
+
+
+class FrameWriter():
+    def __init__(self, path, player_id, game_info, game_data):
+        self.path = path
+        self.frames = 0
+        self.handle = open(path, 'wb')
+        info = game_info.SerializeToString()
+        data = game_data.SerializeToString()
+        self.handle.write(FILE_HEADER.pack(MAGIC, player_id, len(info), len(data)))
+        self.handle.write(info)
+        self.handle.write(data)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def write(self, response_observation):
+        for section in encode(response_observation):
+            self.handle.write(section.tobytes())
+        self.frames += 1
+
+    def close(self):
+        if not self.handle.closed:
+            self.handle.close()
+
+
+class Frame():
+    def __init__(self, buffer, offset):
+        self.header = np.frombuffer(buffer, dtype=FRAME_DTYPE, count=1, offset=offset)[0]
+        offset += FRAME_DTYPE.itemsize
+        # every section is a view straight into the mapped file
+        for (name, dtype) in SECTIONS:
+            count = int(self.header[name])
+            setattr(self, name, np.frombuffer(buffer, dtype=dtype, count=count, offset=offset))
+            offset += count * dtype.itemsize
+
+    @property
+    def game_loop(self):
+        return int(self.header['game_loop'])
+
+    def observation(self):
+        response = sc_pb.ResponseObservation()
+        observation = response.observation
+        observation.game_loop = self.game_loop
+        common = observation.player_common
+        for name in COMMON_FIELDS:
+            setattr(common, name, int(self.header[name]))
+        raw = observation.raw_data
+        orders = {}
+        for (unit, ability_id, target, target_tag, x, y, progress) in self.orders.tolist():
+            orders.setdefault(unit, []).append((ability_id, target, target_tag, x, y, progress))
+        for (index, record) in enumerate(self.units.tolist()):
+            (tag, unit_type, alliance, display_type, owner, cloak, flags,
+                    assigned_harvesters, ideal_harvesters, cargo_space_taken, cargo_space_max,
+                    x, y, z, facing, radius, build_progress,
+                    health, health_max, shield, shield_max, energy, energy_max,
+                    weapon_cooldown, mineral_contents, vespene_contents,
+                    add_on_tag, engaged_target_tag) = record
+            unit = raw_pb.Unit(
+                    tag=tag, unit_type=unit_type, alliance=alliance, display_type=display_type, owner=owner,
+                    cloak=cloak, is_flying=bool(flags & FLYING), is_burrowed=bool(flags & BURROWED),
+                    is_hallucination=bool(flags & HALLUCINATION), is_powered=bool(flags & POWERED),
+                    is_active=bool(flags & ACTIVE), is_blip=bool(flags & BLIP),
+                    assigned_harvesters=assigned_harvesters, ideal_harvesters=ideal_harvesters,
+                    cargo_space_taken=cargo_space_taken, cargo_space_max=cargo_space_max,
+                    facing=facing, radius=radius, build_progress=build_progress,
+                    health=health, health_max=health_max, shield=shield, shield_max=shield_max,
+                    energy=energy, energy_max=energy_max, weapon_cooldown=weapon_cooldown)
+            unit.pos.x = x
+            unit.pos.y = y
+            unit.pos.z = z
+            if mineral_contents:
+                unit.mineral_contents = mineral_contents
+            if vespene_contents:
+                unit.vespene_contents = vespene_contents
+            if add_on_tag:
+                unit.add_on_tag = add_on_tag
+            if engaged_target_tag:
+                unit.engaged_target_tag = engaged_target_tag
+            for (ability_id, target, target_tag, x, y, progress) in orders.get(index, ()):
+                order = unit.orders.add(ability_id=ability_id, progress=progress)
+                if target == UNIT_TARGET:
+                    order.target_unit_tag = target_tag
+                elif target == POINT_TARGET:
+                    order.target_world_space_pos.x = x
+                    order.target_world_space_pos.y = y
+            raw.units.append(unit)
+        raw.event.dead_units.extend(self.dead_units.tolist())
+        for (tag, x, y, z, radius) in self.power_sources.tolist():
+            raw.player.power_sources.add(pos=common_pb.Point(x=x, y=y, z=z), radius=radius, tag=tag)
+        raw.player.upgrade_ids.extend(self.upgrades.tolist())
+        return response
+
+
+class FrameFile():
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as handle:
+            # the mapping stays valid after the descriptor is closed
+            self.buffer = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+        (magic, self.player_id, info_size, data_size) = FILE_HEADER.unpack_from(self.buffer, 0)
+        if magic != MAGIC:
+            raise ValueError('%s is not a frame file' % path)
+        offset = FILE_HEADER.size
+        self.game_info = sc_pb.ResponseGameInfo.FromString(self.buffer[offset:offset + info_size])
+        offset += info_size
+        self.game_data = sc_pb.ResponseData.FromString(self.buffer[offset:offset + data_size])
+        offset += data_size
+        self.offsets = []
+        while offset + FRAME_DTYPE.itemsize <= len(self.buffer):
+            size = int(np.frombuffer(self.buffer, dtype='<u4', count=1, offset=offset)[0])
+            if size < FRAME_DTYPE.itemsize or offset + size > len(self.buffer):
+                # the game died while this frame was being written
+                break
+            self.offsets.append(offset)
+            offset += size
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def __getitem__(self, index):
+        return Frame(self.buffer, self.offsets[index])
+
+    def __iter__(self):
+        for offset in self.offsets:
+            yield Frame(self.buffer, offset)
+
+
+class ObservationRecorder():
+    def __init__(self, path):
+        self.path = path
+        self.writer = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def attach(self, bot):
+        # issue_events runs once per step after the new state is in place,
+        # including the first step, so it sees every observation exactly once
+        issue_events = bot.issue_events
+        async def recording_issue_events():
+            if self.writer is None:
+                await self.open(bot)
+            self.writer.write(bot.state.response_observation)
+            await issue_events()
+        bot.issue_events = recording_issue_events
+        return bot
+
+    async def open(self, bot):
+        response = await bot._client._execute(
+                data=sc_pb.RequestData(ability_id=True, unit_type_id=True, upgrade_id=True, buff_id=True, effect_id=True))
+        self.writer = FrameWriter(self.path, bot.player_id, bot._game_info._proto, response.data)
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
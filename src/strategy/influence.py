@@ -0,0 +1,200 @@
+from sc2.data import Alliance
+from sc2.position import Point2
+
+import numpy as np
+
+
+STRENGTH = 0
+PRESENCE = 1
+
+
+def box_sum(grid, reach):
+    # sum over the (2 * reach + 1) square around every cell, from an integral image
+    (height, width) = grid.shape[-2:]
+    padded = np.pad(grid, [(0, 0)] * (grid.ndim - 2) + [(reach + 1, reach), (reach + 1, reach)])
+    integral = padded.cumsum(axis=-2).cumsum(axis=-1)
+    size = 2 * reach + 1
+    return (integral[..., size:, size:] - integral[..., :-size, size:]
+            - integral[..., size:, :-size] + integral[..., :-size, :-size])
+
+
+class InfluenceMap():
+    def __init__(self, bot, cell_size=4, half_life=224, forget_below=0.05, cluster_reach=1):
+        self.bot = bot
+        self.cell_size = cell_size
+        # stale sightings lose half their weight every half_life game loops
+        self.half_life = half_life
+        self.forget_below = forget_below
+        self.cluster_reach = cluster_reach
+        self.state = None
+        self.shape = None
+        self.enemy = None
+        self.stale = None
+        self.friendly = None
+        self.stale_loop = 0
+        self.seen = {}
+        self.remembered = {}
+        self.weapons = {}
+        self.disks = {}
+
+    def setup(self):
+        size = self.bot.game_info.map_size
+        self.shape = (int(np.ceil(size.height / self.cell_size)), int(np.ceil(size.width / self.cell_size)))
+        self.enemy = np.zeros((2,) + self.shape)
+        self.stale = np.zeros((2,) + self.shape)
+        self.friendly = np.zeros(self.shape)
+
+    def dps_of(self, unit_type):
+        dps = self.weapons.get(unit_type)
+        if dps is None:
+            dps = 0.0
+            data = self.bot._game_data.units.get(unit_type)
+            if data is not None:
+                for weapon in data._proto.weapons:
+                    if weapon.speed > 0:
+                        dps = max(dps, weapon.damage * weapon.attacks / weapon.speed)
+            self.weapons[unit_type] = dps
+        return dps
+
+    def cell_of(self, x, y):
+        return (min(max(int(y // self.cell_size), 0), self.shape[0] - 1),
+                min(max(int(x // self.cell_size), 0), self.shape[1] - 1))
+
+    def centre_of(self, cell_y, cell_x):
+        return Point2(((cell_x + 0.5) * self.cell_size, (cell_y + 0.5) * self.cell_size))
+
+    def refresh(self):
+        if self.bot.state is self.state:
+            return
+        self.state = self.bot.state
+        if self.shape is None:
+            self.setup()
+        game_loop = self.state.game_loop
+        self.stale *= 0.5 ** ((game_loop - self.stale_loop) / self.half_life)
+        self.stale_loop = game_loop
+        # only units that moved cell, took damage or appeared change the grids
+        (enemy_cells, enemy_deltas, friendly_cells, friendly_deltas) = ([], [], [], [])
+        visible = set()
+        for unit in self.state.observation_raw.units:
+            if unit.alliance == Alliance.Enemy.value:
+                enemy = True
+            elif unit.alliance == Alliance.Self.value:
+                enemy = False
+            else:
+                continue
+            tag = unit.tag
+            visible.add(tag)
+            cell = self.cell_of(unit.pos.x, unit.pos.y)
+            strength = self.dps_of(unit.unit_type) * (unit.health + unit.shield)
+            previous = self.seen.get(tag)
+            if previous is not None and previous[1] == cell and previous[2] == strength:
+                continue
+            if enemy:
+                self.forget_stale(tag)
+                if previous is not None:
+                    enemy_cells.append(previous[1])
+                    enemy_deltas.append((-previous[2], -1.0))
+                enemy_cells.append(cell)
+                enemy_deltas.append((strength, 1.0))
+            else:
+                if previous is not None:
+                    friendly_cells.append(previous[1])
+                    friendly_deltas.append(-previous[2])
+                friendly_cells.append(cell)
+                friendly_deltas.append(strength)
+            self.seen[tag] = (enemy, cell, strength)
+        for tag in [tag for tag in self.seen if tag not in visible]:
+            (enemy, cell, strength) = self.seen.pop(tag)
+            if enemy:
+                # out of sight, not necessarily gone, so it is remembered and fades
+                enemy_cells.append(cell)
+                enemy_deltas.append((-strength, -1.0))
+                self.stale[STRENGTH][cell] += strength
+                self.stale[PRESENCE][cell] += 1.0
+                self.remembered[tag] = (cell, strength, game_loop)
+            else:
+                friendly_cells.append(cell)
+                friendly_deltas.append(-strength)
+        if enemy_cells:
+            (ys, xs) = zip(*enemy_cells)
+            deltas = np.array(enemy_deltas)
+            np.add.at(self.enemy[STRENGTH], (ys, xs), deltas[:, 0])
+            np.add.at(self.enemy[PRESENCE], (ys, xs), deltas[:, 1])
+        if friendly_cells:
+            (ys, xs) = zip(*friendly_cells)
+            np.add.at(self.friendly, (ys, xs), friendly_deltas)
+        for (tag, (_, _, loop)) in list(self.remembered.items()):
+            if 0.5 ** ((game_loop - loop) / self.half_life) < self.forget_below:
+                self.forget_stale(tag)
+
+    def forget_stale(self, tag):
+        remembered = self.remembered.pop(tag, None)
+        if remembered is None:
+            return
+        (cell, strength, loop) = remembered
+        weight = 0.5 ** ((self.stale_loop - loop) / self.half_life)
+        self.stale[STRENGTH][cell] = max(0.0, self.stale[STRENGTH][cell] - strength * weight)
+        self.stale[PRESENCE][cell] = max(0.0, self.stale[PRESENCE][cell] - weight)
+
+    def forget(self, tag):
+        # a destroyed unit is neither seen nor remembered
+        self.refresh()
+        self.forget_stale(tag)
+        previous = self.seen.pop(tag, None)
+        if previous is not None:
+            (enemy, cell, strength) = previous
+            if enemy:
+                self.enemy[STRENGTH][cell] -= strength
+                self.enemy[PRESENCE][cell] -= 1.0
+            else:
+                self.friendly[cell] -= strength
+
+    def strength_of(self, units):
+        return sum(self.dps_of(unit.type_id.value) * (unit.health + unit.shield) for unit in units)
+
+    def disk(self, radius):
+        mask = self.disks.get(radius)
+        if mask is None:
+            reach = int(np.ceil(radius / self.cell_size))
+            offsets = np.arange(-reach, reach + 1) * self.cell_size
+            mask = np.hypot(offsets[:, None], offsets[None, :]) <= radius
+            self.disks[radius] = mask
+        return mask
+
+    def threat_near(self, positions, radius, stale=False):
+        # the strongest enemy cell within radius of each position
+        self.refresh()
+        threat = self.enemy[STRENGTH] + self.stale[STRENGTH] if stale else self.enemy[STRENGTH]
+        mask = self.disk(radius)
+        reach = mask.shape[0] // 2
+        result = np.zeros(len(positions))
+        for (index, position) in enumerate(positions):
+            (cell_y, cell_x) = self.cell_of(position[0], position[1])
+            (y0, x0) = (cell_y - reach, cell_x - reach)
+            (y1, x1) = (max(y0, 0), max(x0, 0))
+            window = threat[y1:cell_y + reach + 1, x1:cell_x + reach + 1]
+            window_mask = mask[y1 - y0:y1 - y0 + window.shape[0], x1 - x0:x1 - x0 + window.shape[1]]
+            if window_mask.any():
+                result[index] = window[window_mask].max()
+        return result
+
+    def weakest_cluster(self, position, strength):
+        # the nearest enemy cluster the given strength, plus any friendly units
+        # already there, can beat; failing that the weakest cluster on the map
+        self.refresh()
+        grids = self.enemy + self.stale
+        (cluster_threat, cluster_friendly) = (
+                box_sum(grids[STRENGTH], self.cluster_reach),
+                box_sum(self.friendly, self.cluster_reach))
+        (ys, xs) = np.nonzero(grids[PRESENCE] > self.forget_below)
+        if len(ys) == 0:
+            return None
+        threat = cluster_threat[ys, xs]
+        beatable = threat <= strength + cluster_friendly[ys, xs]
+        if beatable.any():
+            centres = (np.stack([xs, ys], axis=-1) + 0.5) * self.cell_size
+            distance = np.linalg.norm(centres - (position[0], position[1]), axis=-1)
+            best = int(np.argmin(np.where(beatable, distance, np.inf)))
+        else:
+            best = int(np.argmin(threat))
+        return self.centre_of(ys[best], xs[best])
@@ -0,0 +1,123 @@
+from sc2.ids.unit_typeid import UnitTypeId
+
+
+class ProductionLedger():
+    def __init__(self, bot):
+        self.bot = bot
+        self.state = None
+        self.products = None
+        self.in_progress_type = {}
+        self.orders = {}
+        self.order_loop = {}
+        self.pending_counts = {}
+
+    def product_of(self, ability):
+        if self.products is None:
+            # which unit type each build or train ability produces
+            self.products = {}
+            for (type_value, data) in self.bot._game_data.units.items():
+                creation = data.creation_ability
+                if creation is not None and creation.id not in self.products:
+                    try:
+                        self.products[creation.id] = UnitTypeId(type_value)
+                    except ValueError:
+                        continue
+        return self.products.get(ability)
+
+    def refresh(self):
+        # a new observation is the only time orders can have started,
+        # finished or been dropped, so that is when the ledger is reconciled
+        if self.bot.state is self.state:
+            return
+        self.state = self.bot.state
+        game_loop = self.state.game_loop
+        for tag in list(self.in_progress_type):
+            unit = self.bot.unit_index.find_by_tag(tag)
+            if unit is None or unit.build_progress >= 1:
+                self.forget_in_progress(tag)
+        for producer in list(self.orders):
+            if self.order_loop[producer] >= game_loop:
+                # issued this step, the observation can't show it yet
+                continue
+            unit = self.bot.unit_index.find_by_tag(producer)
+            counts = {}
+            if unit is not None:
+                for order in unit.orders:
+                    product = self.product_of(order.ability.id)
+                    if product is not None:
+                        counts[product] = counts.get(product, 0) + 1
+            self.set_orders(producer, counts)
+
+    def seed(self):
+        # one full scan at the start, everything after that comes from events
+        self.refresh()
+        for unit in self.bot.units:
+            if unit.build_progress < 1:
+                self.add_in_progress(unit)
+            if unit.orders:
+                self.order_loop[unit.tag] = -1
+                self.orders[unit.tag] = {}
+        self.state = None
+        self.refresh()
+
+    def add_in_progress(self, unit):
+        if unit.tag in self.in_progress_type:
+            return
+        self.in_progress_type[unit.tag] = unit.type_id
+        self.pending_counts[unit.type_id] = self.pending_counts.get(unit.type_id, 0) + 1
+
+    def forget_in_progress(self, tag):
+        type_id = self.in_progress_type.pop(tag, None)
+        if type_id is not None:
+            self.pending_counts[type_id] -= 1
+
+    def set_orders(self, producer, counts):
+        for (product, count) in self.orders.get(producer, {}).items():
+            self.pending_counts[product] -= count
+        for (product, count) in counts.items():
+            self.pending_counts[product] = self.pending_counts.get(product, 0) + count
+        if counts:
+            self.orders[producer] = counts
+        else:
+            self.orders.pop(producer, None)
+            self.order_loop.pop(producer, None)
+
+    def unit_created(self, unit):
+        self.refresh()
+        if unit.build_progress < 1:
+            self.add_in_progress(unit)
+
+    def construction_started(self, unit):
+        self.refresh()
+        if unit.build_progress < 1:
+            self.add_in_progress(unit)
+
+    def unit_destroyed(self, tag):
+        self.refresh()
+        self.forget_in_progress(tag)
+        self.set_orders(tag, {})
+
+    def issued(self, command):
+        self.refresh()
+        self.adjust(command, 1)
+
+    def withdrawn(self, command):
+        self.refresh()
+        self.adjust(command, -1)
+
+    def adjust(self, command, sign):
+        product = self.product_of(command.ability)
+        if product is None:
+            return
+        producer = command.unit.tag
+        counts = dict(self.orders.get(producer, {}))
+        counts[product] = counts.get(product, 0) + sign
+        if counts[product] <= 0:
+            del counts[product]
+        self.set_orders(producer, counts)
+        if counts:
+            self.order_loop[producer] = self.state.game_loop
+
+    def pending(self, type_id):
+        self.refresh()
+        return self.pending_counts.get(type_id, 0)
@@ -0,0 +1,32 @@
+import json
+import numpy as np
+import os
+import re
+import zipfile
+
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 't800', 'maps')
+
+
+def cache_path(cache_dir, map_name, kind):
+    return os.path.join(cache_dir, '%s.%s.npz' % (re.sub(r'[^\w.-]+', '_', map_name), kind))
+
+def load(cache_dir, map_name, kind, params):
+    # anything unreadable or built with other parameters is just a cache miss
+    path = cache_path(cache_dir, map_name, kind)
+    try:
+        with np.load(path, allow_pickle=False) as archive:
+            if json.loads(str(archive['params'])) != params:
+                return None
+            return {name: archive[name] for name in archive.files if name != 'params'}
+    except (OSError, KeyError, ValueError, zipfile.BadZipFile):
+        return None
+
+def save(cache_dir, map_name, kind, params, arrays):
+    path = cache_path(cache_dir, map_name, kind)
+    os.makedirs(cache_dir, exist_ok=True)
+    partial = '%s.%d.tmp' % (path, os.getpid())
+    with open(partial, 'wb') as handle:
+        np.savez(handle, params=np.array(json.dumps(params, sort_keys=True)), **arrays)
+    # parallel games on the same map may race to write the same entry
+    os.replace(partial, path)
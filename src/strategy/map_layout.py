@@ -0,0 +1,165 @@
+from sc2.position import Point2
+
+from strategy import map_cache
+
+import numpy as np
+
+
+PYLON_SIZE = 2
+PRODUCTION_SIZE = 3
+
+
+def footprint_fits(grid, size):
+    # fits[y, x] is true when the size x size block with its lower left
+    # corner at cell (x, y) is entirely placeable, from an integral image
+    (height, width) = grid.shape
+    integral = np.zeros((height + 1, width + 1), dtype=np.int32)
+    integral[1:, 1:] = np.cumsum(np.cumsum(grid.astype(np.int32), axis=0), axis=1)
+    blocks = (integral[size:, size:] - integral[:-size, size:]
+            - integral[size:, :-size] + integral[:-size, :-size])
+    return blocks == size * size
+
+def building_centres(grid, size):
+    (ys, xs) = np.nonzero(footprint_fits(grid, size))
+    return np.stack([xs + size / 2.0, ys + size / 2.0], axis=-1)
+
+def segment_distances(points, start, ends):
+    # distance from every point to every segment running from start to one of ends
+    direction = ends - start
+    length = np.maximum((direction ** 2).sum(axis=-1), 1e-9)
+    offset = points[:, None, :] - start
+    along = np.clip((offset * direction[None, :, :]).sum(axis=-1) / length[None, :], 0.0, 1.0)
+    nearest = start + along[..., None] * direction[None, :, :]
+    return np.linalg.norm(points[:, None, :] - nearest, axis=-1)
+
+
+class MapLayout():
+    def __init__(self, map_name, cache_dir=map_cache.DEFAULT_CACHE_DIR,
+            base_radius=15.0, nexus_clearance=5.0, resource_clearance=3.0, worker_lane=2.0):
+        self.map_name = map_name
+        self.cache_dir = cache_dir
+        self.base_radius = base_radius
+        self.nexus_clearance = nexus_clearance
+        self.resource_clearance = resource_clearance
+        self.worker_lane = worker_lane
+        self.expansions = np.zeros((0, 2))
+        self.geysers = np.zeros((0, 2))
+        self.geyser_base = np.zeros(0, dtype=np.int32)
+        self.pylons = np.zeros((0, 2))
+        self.pylon_base = np.zeros(0, dtype=np.int32)
+        self.production = np.zeros((0, 2))
+        self.production_base = np.zeros(0, dtype=np.int32)
+        self.bases = {}
+        self.base_geysers = []
+        self.base_pylons = []
+        self.base_production = []
+
+    def params(self):
+        return {
+            'base_radius': self.base_radius,
+            'nexus_clearance': self.nexus_clearance,
+            'resource_clearance': self.resource_clearance,
+            'worker_lane': self.worker_lane,
+        }
+
+    def key(self, position):
+        return (int(round(position[0])), int(round(position[1])))
+
+    def load_or_build(self, bot):
+        cached = map_cache.load(self.cache_dir, self.map_name, 'layout', self.params())
+        if cached is None:
+            self.build(bot.expansion_locations, bot.game_info.placement_grid.data_numpy)
+            map_cache.save(self.cache_dir, self.map_name, 'layout', self.params(), {
+                'expansions': self.expansions,
+                'geysers': self.geysers,
+                'geyser_base': self.geyser_base,
+                'pylons': self.pylons,
+                'pylon_base': self.pylon_base,
+                'production': self.production,
+                'production_base': self.production_base,
+            })
+        else:
+            for (name, array) in cached.items():
+                setattr(self, name, array)
+        self.index()
+        return cached is not None
+
+    def build(self, expansion_locations, placement_grid):
+        expansions = []
+        geysers = []
+        geyser_base = []
+        resources = []
+        for (base, (centre, group)) in enumerate(expansion_locations.items()):
+            expansions.append((centre.x, centre.y))
+            resources.append(np.array([(r.position.x, r.position.y) for r in group], dtype=float).reshape(-1, 2))
+            for resource in group:
+                if resource.is_vespene_geyser:
+                    geysers.append((resource.position.x, resource.position.y))
+                    geyser_base.append(base)
+        self.expansions = np.array(expansions, dtype=float).reshape(-1, 2)
+        self.geysers = np.array(geysers, dtype=float).reshape(-1, 2)
+        self.geyser_base = np.array(geyser_base, dtype=np.int32)
+        (self.pylons, self.pylon_base) = self.candidates(
+                building_centres(placement_grid, PYLON_SIZE), resources)
+        (self.production, self.production_base) = self.candidates(
+                building_centres(placement_grid, PRODUCTION_SIZE), resources)
+
+    def candidates(self, centres, resources):
+        ranked = []
+        owners = []
+        for (base, centre) in enumerate(self.expansions):
+            distance = np.linalg.norm(centres - centre, axis=-1)
+            near = (distance <= self.base_radius) & (distance >= self.nexus_clearance)
+            points = centres[near]
+            distance = distance[near]
+            group = resources[base]
+            if len(group) > 0:
+                # keep clear of the resources and the lanes workers mine along
+                clear = np.linalg.norm(points[:, None, :] - group[None, :, :], axis=-1).min(axis=1) >= self.resource_clearance
+                clear &= segment_distances(points, centre, group).min(axis=1) >= self.worker_lane
+                points = points[clear]
+                distance = distance[clear]
+            order = np.argsort(distance, kind='stable')
+            ranked.append(points[order])
+            owners.append(np.full(len(order), base, dtype=np.int32))
+        if len(ranked) == 0:
+            return (np.zeros((0, 2)), np.zeros(0, dtype=np.int32))
+        return (np.concatenate(ranked), np.concatenate(owners))
+
+    def index(self):
+        self.bases = {self.key(centre): base for (base, centre) in enumerate(self.expansions)}
+        self.base_geysers = self.split(self.geysers, self.geyser_base)
+        self.base_pylons = self.split(self.pylons, self.pylon_base)
+        self.base_production = self.split(self.production, self.production_base)
+
+    def split(self, points, owners):
+        split = [[] for _ in range(len(self.expansions))]
+        for ((x, y), base) in zip(points.tolist(), owners.tolist()):
+            split[base].append(Point2((x, y)))
+        return split
+
+    def base_of(self, position):
+        key = self.key(position)
+        if key in self.bases:
+            return self.bases[key]
+        if len(self.expansions) == 0:
+            return None
+        distance = np.linalg.norm(self.expansions - (position[0], position[1]), axis=-1)
+        if distance.min() > self.nexus_clearance:
+            # misses aren't remembered, every position on the map would end up in the memo
+            return None
+        base = int(distance.argmin())
+        self.bases[key] = base
+        return base
+
+    def geysers_at(self, position):
+        base = self.base_of(position)
+        return self.base_geysers[base] if base is not None else []
+
+    def pylon_spots(self, position):
+        base = self.base_of(position)
+        return self.base_pylons[base] if base is not None else []
+
+    def production_spots(self, position):
+        base = self.base_of(position)
+        return self.base_production[base] if base is not None else []
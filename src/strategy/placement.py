@@ -0,0 +1,148 @@
+from sc2.constants import NEXUS, PYLON, ASSIMILATOR, PHOTONCANNON
+from sc2.constants import GATEWAY, FORGE, CYBERNETICSCORE, STARGATE, ROBOTICSFACILITY
+from sc2.data import Attribute
+from sc2.position import Point2
+
+from strategy.map_layout import footprint_fits
+
+import numpy as np
+
+
+FOOTPRINTS = {
+    NEXUS: 5,
+    PYLON: 2,
+    PHOTONCANNON: 2,
+    ASSIMILATOR: 3,
+    GATEWAY: 3,
+    FORGE: 3,
+    CYBERNETICSCORE: 3,
+    STARGATE: 3,
+    ROBOTICSFACILITY: 3,
+}
+UNPOWERED = {NEXUS, PYLON, ASSIMILATOR}
+
+
+def footprint_of(radius):
+    # structures are square and their radius is a little over half the side
+    return max(1, int(round(radius * 2.0 - 0.5)))
+
+def corner(position, size):
+    return (int(round(position[0] - size / 2.0)), int(round(position[1] - size / 2.0)))
+
+
+class PlacementGrid():
+    def __init__(self, bot, reservation_loops=224):
+        self.bot = bot
+        self.reservation_loops = reservation_loops
+        self.state = None
+        self.placeable = None
+        self.free = None
+        self.fits = {}
+        self.sources = np.zeros((0, 3))
+        self.reservations = []
+        self.structure_types = {}
+
+    def refresh(self):
+        if self.bot.state is self.state:
+            return
+        self.state = self.bot.state
+        if self.placeable is None:
+            self.placeable = self.bot.game_info.placement_grid.data_numpy != 0
+        free = self.placeable.copy()
+        # straight off the proto, python-sc2 flips creep but not the placement grid
+        creep = self.state.observation_raw.map_state.creep
+        if (creep.size.y, creep.size.x) == free.shape:
+            # protoss can't build on creep
+            bits = np.unpackbits(np.frombuffer(creep.data, dtype=np.uint8))[:free.size]
+            free &= bits.reshape(free.shape) == 0
+        # straight off the raw protos, wrapping every unit in a Unit costs more than the stamping
+        for unit in self.state.observation_raw.units:
+            if self.is_structure(unit.unit_type):
+                self.stamp(free, (unit.pos.x, unit.pos.y), footprint_of(unit.radius))
+        game_loop = self.state.game_loop
+        self.reservations = [
+            (expires, size, position)
+            for (expires, size, position) in self.reservations
+            if expires > game_loop
+        ]
+        for (_, size, position) in self.reservations:
+            self.stamp(free, position, size)
+        self.free = free
+        self.fits = {}
+        self.sources = np.array([
+            (source.position.x, source.position.y, source.radius)
+            for source in self.state.psionic_matrix.sources
+        ], dtype=float).reshape(-1, 3)
+
+    def is_structure(self, unit_type):
+        structure = self.structure_types.get(unit_type)
+        if structure is None:
+            data = self.bot._game_data.units.get(unit_type)
+            structure = data is not None and Attribute.Structure.value in data.attributes
+            self.structure_types[unit_type] = structure
+        return structure
+
+    def stamp(self, grid, position, size):
+        (x, y) = corner(position, size)
+        grid[max(0, y):max(0, y + size), max(0, x):max(0, x + size)] = False
+
+    def fits_for(self, size):
+        fits = self.fits.get(size)
+        if fits is None:
+            fits = footprint_fits(self.free, size)
+            self.fits[size] = fits
+        return fits
+
+    def powered(self, points):
+        if len(self.sources) == 0:
+            return np.zeros(len(points), dtype=bool)
+        distance = np.linalg.norm(points[:, None, :] - self.sources[None, :, :2], axis=-1)
+        return (distance <= self.sources[None, :, 2]).any(axis=1)
+
+    def covers(self, position):
+        self.refresh()
+        return bool(self.powered(np.array([(position[0], position[1])], dtype=float))[0])
+
+    def can_place(self, building, position):
+        self.refresh()
+        size = FOOTPRINTS.get(building, 3)
+        fits = self.fits_for(size)
+        (x, y) = corner(position, size)
+        if not (0 <= y < fits.shape[0] and 0 <= x < fits.shape[1]) or not fits[y, x]:
+            return False
+        return building in UNPOWERED or self.covers(position)
+
+    def spots(self, building, near, max_distance=20, min_distance=0, power=None):
+        # every free spot for the building between min_distance and
+        # max_distance of near; power=None means powered only when required
+        self.refresh()
+        size = FOOTPRINTS.get(building, 3)
+        fits = self.fits_for(size)
+        reach = int(np.ceil(max_distance)) + size
+        x0 = max(0, int(near[0]) - reach)
+        y0 = max(0, int(near[1]) - reach)
+        window = fits[y0:int(near[1]) + reach, x0:int(near[0]) + reach]
+        (ys, xs) = np.nonzero(window)
+        centres = np.stack([xs + x0 + size / 2.0, ys + y0 + size / 2.0], axis=-1)
+        distance = np.linalg.norm(centres - (near[0], near[1]), axis=-1)
+        keep = (distance <= max_distance) & (distance >= min_distance)
+        if power is None:
+            power = building not in UNPOWERED
+        if power:
+            keep[keep] = self.powered(centres[keep])
+        return (centres[keep], distance[keep])
+
+    def find_placement(self, building, near, max_distance=20):
+        (centres, distance) = self.spots(building, near, max_distance)
+        if len(centres) == 0:
+            return None
+        (x, y) = centres[int(np.argmin(distance))]
+        return Point2((float(x), float(y)))
+
+    def reserve(self, building, position):
+        # keeps the spot taken while the worker walks there
+        size = FOOTPRINTS.get(building, 3)
+        self.reservations.append((self.bot.state.game_loop + self.reservation_loops, size, position))
+        if self.free is not None:
+            self.stamp(self.free, position, size)
+            self.fits = {}
@@ -0,0 +1,50 @@
+class PlanPool():
+    # runs planning away from the game loop: functions go to the executor
+    # (a thread or process pool, so their arguments are plain snapshots);
+    # anything that talks to the client stays on the game loop, which owns
+    # the websocket; without an executor everything runs inline, which keeps
+    # offline games and replays deterministic
+    def __init__(self, executor=None):
+        self.executor = executor
+        self.pending = {}
+        self.ready = {}
+        self.failures = 0
+
+    @property
+    def offloaded(self):
+        return self.executor is not None
+
+    def submit(self, key, context, function, *args):
+        # at most one plan of each key in flight, later requests wait their turn
+        if key in self.pending:
+            return False
+        if self.executor is None:
+            self.ready[key] = (context, function(*args))
+        else:
+            self.pending[key] = (context, self.executor.submit(function, *args))
+        return True
+
+    def collect(self):
+        for (key, (context, future)) in list(self.pending.items()):
+            if not future.done():
+                continue
+            del self.pending[key]
+            try:
+                self.ready[key] = (context, future.result())
+            except Exception:
+                # the last good plan stays in use
+                self.failures += 1
+
+    def take_all(self, kind):
+        # keys are (kind, id) pairs
+        self.collect()
+        ready = [(key, plan) for (key, plan) in self.ready.items() if key[0] == kind]
+        for (key, _) in ready:
+            del self.ready[key]
+        return ready
+
+    def cancel(self):
+        for (_, future) in self.pending.values():
+            future.cancel()
+        self.pending.clear()
+        self.ready.clear()
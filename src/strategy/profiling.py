@@ -0,0 +1,152 @@
+import json
+import time
+
+
+class Histogram():
+    # log-linear buckets over integer microseconds, as in HdrHistogram: each
+    # power of two is split into 2 ** precision sub-buckets, so every value
+    # is kept to within about 1 / 2 ** precision of its true size
+    def __init__(self, precision=5):
+        self.precision = precision
+        self.counts = {}
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = 0
+
+    def bucket(self, value):
+        shift = max(value.bit_length() - self.precision - 1, 0)
+        return (shift << (self.precision + 1)) | (value >> shift)
+
+    def highest(self, bucket):
+        shift = bucket >> (self.precision + 1)
+        sub = bucket & ((1 << (self.precision + 1)) - 1)
+        return ((sub + 1) << shift) - 1
+
+    def record(self, value):
+        bucket = self.bucket(value)
+        self.counts[bucket] = self.counts.get(bucket, 0) + 1
+        self.count += 1
+        self.total += value
+        if self.min is None or value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+
+    def percentile(self, fraction):
+        if self.count == 0:
+            return None
+        rank = max(1, int(round(fraction * self.count)))
+        seen = 0
+        for bucket in sorted(self.counts):
+            seen += self.counts[bucket]
+            if seen >= rank:
+                return min(self.highest(bucket), self.max)
+        return self.max
+
+    def summary(self):
+        if self.count == 0:
+            return {'count': 0}
+        return {
+            'count': self.count,
+            'mean_ms': self.total / self.count / 1000.0,
+            'min_ms': self.min / 1000.0,
+            'p50_ms': self.percentile(0.50) / 1000.0,
+            'p95_ms': self.percentile(0.95) / 1000.0,
+            'p99_ms': self.percentile(0.99) / 1000.0,
+            'max_ms': self.max / 1000.0,
+        }
+
+
+class StepProfiler():
+    def __init__(self, path, budget=0.02, enabled=True):
+        self.path = path
+        self.budget = budget
+        self.enabled = enabled
+        self.histograms = {}
+        self.steps = 0
+        self.over_budget = 0
+        self.result = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def record(self, name, micros):
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            histogram = Histogram()
+            self.histograms[name] = histogram
+        histogram.record(micros)
+
+    def timed(self, name, action):
+        async def timed_action(*args, **kwargs):
+            start = time.perf_counter_ns()
+            try:
+                return await action(*args, **kwargs)
+            finally:
+                self.record(name, (time.perf_counter_ns() - start) // 1000)
+        return timed_action
+
+    def attach(self, bot):
+        # disabled means nothing is wrapped, so the bot runs untouched
+        if not self.enabled:
+            return bot
+        budget = int(self.budget * 1000000) if self.budget is not None else None
+        on_step = bot.on_step
+        async def profiled_on_step(iteration):
+            start = time.perf_counter_ns()
+            try:
+                await on_step(iteration)
+            finally:
+                micros = (time.perf_counter_ns() - start) // 1000
+                self.record('on_step', micros)
+                self.steps += 1
+                if budget is not None and micros > budget:
+                    self.over_budget += 1
+        bot.on_step = profiled_on_step
+        scheduler = getattr(bot, 'scheduler', None)
+        if scheduler is not None:
+            for task in scheduler.tasks:
+                task.action = self.timed('task.' + task.name, task.action)
+        for name in getattr(bot, 'PROFILE_TASKS', ()):
+            setattr(bot, name, self.timed('task.' + name, getattr(bot, name)))
+        # every request to the game goes through the client's _execute,
+        # keyed by the request kind
+        prepare_start = bot._prepare_start
+        def profiled_prepare_start(client, *args, **kwargs):
+            execute = client._execute
+            async def profiled_execute(**kwargs):
+                start = time.perf_counter_ns()
+                try:
+                    return await execute(**kwargs)
+                finally:
+                    micros = (time.perf_counter_ns() - start) // 1000
+                    for kind in kwargs:
+                        self.record('client.' + kind, micros)
+            client._execute = profiled_execute
+            return prepare_start(client, *args, **kwargs)
+        bot._prepare_start = profiled_prepare_start
+        on_end = bot.on_end
+        def profiled_on_end(game_result):
+            self.result = getattr(game_result, 'name', str(game_result))
+            return on_end(game_result)
+        bot.on_end = profiled_on_end
+        return bot
+
+    def summary(self):
+        return {
+            'result': self.result,
+            'steps': self.steps,
+            'budget_ms': self.budget * 1000.0 if self.budget is not None else None,
+            'over_budget': self.over_budget,
+            'timings': {name: histogram.summary() for (name, histogram) in sorted(self.histograms.items())},
+        }
+
+    def close(self):
+        if not self.enabled or not self.histograms:
+            return
+        with open(self.path, 'w') as handle:
+            json.dump(self.summary(), handle, indent=2)
@@ -3,51 +3,86 @@ from sc2 import Race, Difficulty
 from sc2.constants import *
 from sc2.player import Bot, Computer
 
+from strategy.command_buffer import CommandBuffer
+from strategy.ledger import ProductionLedger
+from strategy.placement import PlacementGrid
+from strategy.unit_index import UnitIndex
+
 import random
 
 class CannonRush(sc2.BotAI):
     def __init__(self, log):
         self.log = log
+        self.PROFILE_TASKS = ('rush',)
+        self.ledger = ProductionLedger(self)
+        self.commands = CommandBuffer(self, ledger=self.ledger)
+        self.unit_index = UnitIndex(self)
+        self.placement = PlacementGrid(self)
+
+    def on_start(self):
+        self.ledger.seed()
 
     async def on_step(self, iteration):
         self.iteration = iteration
+        await self.rush()
+        await self.commands.flush()
+
+    async def on_unit_created(self, unit):
+        self.ledger.unit_created(unit)
+
+    async def on_building_construction_started(self, unit):
+        self.ledger.construction_started(unit)
+
+    async def on_unit_destroyed(self, unit_tag):
+        self.ledger.unit_destroyed(unit_tag)
+
+    def build_at(self, building, spot):
+        if spot is None:
+            return False
+        worker = self.select_build_worker(spot)
+        if worker is None or not self.commands.add(worker.build(building, spot)):
+            return False
+        self.placement.reserve(building, spot)
+        return True
 
-        if not self.units(NEXUS).exists:
+    async def rush(self):
+        if not self.unit_index(NEXUS).exists:
             for worker in self.workers:
-                await self.do(worker.attack(self.enemy_start_locations[0]))
+                self.commands.add(worker.attack(self.enemy_start_locations[0]))
             return
         else:
-            nexus = self.units(NEXUS).first
+            nexus = self.unit_index(NEXUS).first
 
         if self.workers.amount < 16 and nexus.noqueue:
             if self.can_afford(PROBE):
-                await self.do(nexus.train(PROBE))
+                self.commands.add(nexus.train(PROBE))
 
-        elif not self.units(PYLON).exists and not self.already_pending(PYLON):
+        elif not self.unit_index(PYLON).exists and not self.ledger.pending(PYLON):
             if self.can_afford(PYLON):
-                await self.build(PYLON, near=nexus)
+                self.build_at(PYLON, self.placement.find_placement(PYLON, nexus.position))
 
-        elif not self.units(FORGE).exists:
-            pylon = self.units(PYLON).ready
+        elif not self.unit_index(FORGE).exists:
+            pylon = self.unit_index.ready(PYLON)
             if pylon.exists:
                 if self.can_afford(FORGE):
-                    await self.build(FORGE, near=pylon.closest_to(nexus))
+                    self.build_at(FORGE, self.placement.find_placement(FORGE, pylon.closest_to(nexus).position))
 
-        elif self.units(PYLON).amount < 2:
+        elif self.unit_index(PYLON).amount < 2:
             if self.can_afford(PYLON):
                 pos = self.enemy_start_locations[0].towards(self.game_info.map_center, random.randrange(8, 15))
-                await self.build(PYLON, near=pos)
+                self.build_at(PYLON, self.placement.find_placement(PYLON, pos))
 
-        elif not self.units(PHOTONCANNON).exists:
-            if self.units(PYLON).ready.amount >= 2 and self.can_afford(PHOTONCANNON):
-                pylon = self.units(PYLON).closer_than(20, self.enemy_start_locations[0]).random
-                await self.build(PHOTONCANNON, near=pylon)
+        elif not self.unit_index(PHOTONCANNON).exists:
+            if self.unit_index.ready(PYLON).amount >= 2 and self.can_afford(PHOTONCANNON):
+                pylon = self.unit_index(PYLON).closer_than(20, self.enemy_start_locations[0]).random
+                self.build_at(PHOTONCANNON, self.placement.find_placement(PHOTONCANNON, pylon.position))
 
         else:
             if self.can_afford(PYLON) and self.can_afford(PHOTONCANNON): # ensure "fair" decision
+                # the ring around a zerg start is mostly creep, so the random
+                # point is only an anchor and the free spot can be up to 20 away
                 for _ in range(20):
                     pos = self.enemy_start_locations[0].random_on_distance(random.randrange(5, 12))
-                    building = PHOTONCANNON if self.state.psionic_matrix.covers(pos) else PYLON
-                    r = await self.build(building, near=pos)
-                    if not r: # success
+                    building = PHOTONCANNON if self.placement.covers(pos) else PYLON
+                    if self.build_at(building, self.placement.find_placement(building, pos)):
                         break
\ No newline at end of file
@@ -5,469 +5,590 @@ from sc2.constants import NEXUS, PROBE, PYLON, ASSIMILATOR, GATEWAY, CYBERNETICS
 from sc2.constants import STALKER, STARGATE, VOIDRAY, OBSERVER, ROBOTICSFACILITY
 from sc2.position import Point2
 
+from strategy.command_buffer import CommandBuffer
+from strategy import map_cache
+from strategy.event_log import DEBUG, INFO
+from strategy.influence import InfluenceMap
+from strategy.ledger import ProductionLedger
+from strategy.map_layout import MapLayout
+from strategy.placement import PlacementGrid
+from strategy.planning import PlanPool
+from strategy.scheduler import Scheduler, CRITICAL, HIGH, NORMAL, LOW
+from strategy.scheduler import UNIT_CREATED, UNIT_DESTROYED, ENEMY_SPOTTED
+from strategy.scouting import ObserverPlanner
+from strategy.squads import SquadRoster, ATTACK, DEFEND, REINFORCE
+from strategy.targeting import TargetAssigner
+from strategy.unit_index import UnitIndex
+from strategy.waypoints import WaypointTable
+
 from datetime import datetime
-import math
 import random
 import sys
 
 
-def calc_angle(target_position, unit_position):
-    height = unit_position.y - target_position.y
-    width = unit_position.x - target_position.x
-    radians = math.atan2(height, width)
-    return radians
-
-def calc_position(map_size, center, radius, radians):
-    y_offset = math.sin(radians) * radius
-    x_offset = math.cos(radians) * radius
-    x_point = x_offset + center.x
-    y_point = y_offset + center.y
-    if x_point < 0:
-        x_point = 0
-    elif x_point >= map_size[0]:
-        x_point = map_size[0] - 1
-    if y_point < 0:
-        y_point = 0
-    elif y_point >= map_size[1]:
-        y_point = map_size[1] - 1
-    position = Point2(tuple([x_point, y_point]))
-    return position
+def nearest_index(waypoints, position):
+    return min(range(len(waypoints)), key=lambda index: waypoints[index].distance_to(position))
 
 class PatrolJob():
-    def __init__(self, **kwargs):
-        self.__dict__.update(kwargs)
-        self.PATROL_RADIUS = 10
-        self.PATROL_ARC_NUM = 8
-        self.angle = None
-
-    def plan_patrol(self, target_position, unit_position):
-        arc = (math.pi * 2.0) / self.PATROL_ARC_NUM
-        if self.angle is None:
-            current_angle = calc_angle(target_position, unit_position)
-            if current_angle < 0:
-                rounded_angle = arc * math.ceil(current_angle / arc)
-            else:
-                rounded_angle = arc * math.floor(current_angle / arc)
-            next_angle = rounded_angle + arc
-        else:
-            next_angle = self.angle + arc
-        patrol_waypoint = calc_position(
-                self.game_info.map_size,
-                target_position,
-                self.PATROL_RADIUS,
-                next_angle)
-        self.angle = next_angle
-        return patrol_waypoint
-
-    def do(self, iteration, observer):
-        self.iteration = iteration
-        self.observer = observer
-        distance = self.observer.position.distance_to(self.base_position)
-        if distance <= (self.PATROL_RADIUS * 1.05):
+    # only the base's tag and coordinates, the observer is resolved each step
+    __slots__ = ('base_tag', 'base_position', 'radius', 'ring', 'index')
+
+    def __init__(self, base_tag, base_position, radius, ring):
+        self.base_tag = base_tag
+        self.base_position = base_position
+        self.radius = radius
+        self.ring = ring
+        self.index = None
+
+    def plan_patrol(self, unit_position):
+        if self.index is None:
+            self.index = nearest_index(self.ring, unit_position)
+        self.index = (self.index + 1) % len(self.ring)
+        return self.ring[self.index]
+
+    def do(self, log, iteration, observer):
+        distance = observer.position.distance_to(self.base_position)
+        if distance <= (self.radius * 1.05) and len(self.ring) > 0:
             # start patroling
-            enemy_location = self.plan_patrol(self.base_position, self.observer.position)
-            print('iteration (%d): observer %d at (%d, %d) patroling base %d at (%d, %d), waypoint (%d, %d)' % (
-                    iteration,
-                    self.observer.tag,
-                    self.observer.position.x,
-                    self.observer.position.y,
-                    self.base_tag,
-                    self.base_position.x,
-                    self.base_position.y,
-                    enemy_location.x,
-                    enemy_location.y),
-                    file=self.log)
+            enemy_location = self.plan_patrol(observer.position)
+            if log.enabled(INFO):
+                log.record(INFO, 'observer_patrol', iteration,
+                        tag=observer.tag,
+                        position=observer.position,
+                        base_tag=self.base_tag,
+                        base_position=self.base_position,
+                        waypoint=enemy_location)
         else:
-            print('iteration (%d): moving observer %d at (%d, %d) to assigned base %d at (%d, %d)' % (
-                    iteration,
-                    self.observer.tag,
-                    self.observer.position.x,
-                    self.observer.position.y,
-                    self.base_tag,
-                    self.base_position.x,
-                    self.base_position.y),
-                    file=self.log)
+            if log.enabled(INFO):
+                log.record(INFO, 'observer_to_base', iteration,
+                        tag=observer.tag,
+                        position=observer.position,
+                        base_tag=self.base_tag,
+                        base_position=self.base_position)
             enemy_location = self.base_position
-        return self.observer.move(enemy_location)
+        return observer.move(enemy_location)
 
 
 class SearchJob():
-    def __init__(self, **kwargs):
-        self.__dict__.update(kwargs)
-        self.START_RADIUS = 10
-        self.SEARCH_ARC_NUM = 8
-        self.angle = None
-        self.radius = self.START_RADIUS
+    __slots__ = ('location_id', 'location_position', 'spacing', 'rings', 'ring', 'index', 'arcs_searched')
+
+    def __init__(self, location_id, location_position, spacing, rings):
+        self.location_id = location_id
+        self.location_position = location_position
+        self.spacing = spacing
+        self.rings = rings
+        self.ring = 0
+        self.index = None
         self.arcs_searched = 0
 
-    def plan_base_search(self, target_position, unit_position):
-        arc = (math.pi * 2.0) / self.SEARCH_ARC_NUM
-        if self.angle is None:
-            current_angle = calc_angle(target_position, unit_position)
-            if current_angle < 0:
-                rounded_angle = arc * math.ceil(current_angle / arc)
-            else:
-                rounded_angle = arc * math.floor(current_angle / arc)
-            next_angle = rounded_angle + arc
-        else:
-            next_angle = self.angle + arc
-        if self.arcs_searched == self.SEARCH_ARC_NUM:
-            self.radius += self.START_RADIUS
+    @property
+    def radius(self):
+        return self.spacing * (self.ring + 1)
+
+    def plan_base_search(self, log, iteration, observer):
+        waypoints = self.rings[self.ring]
+        if self.arcs_searched >= len(waypoints):
+            # widen the search, skipping rings that fall entirely off the map
+            self.ring = (self.ring + 1) % len(self.rings)
+            while len(self.rings[self.ring]) == 0:
+                self.ring = (self.ring + 1) % len(self.rings)
+            waypoints = self.rings[self.ring]
+            self.index = None
             self.arcs_searched = 0
-        print('DEBUG - iteration = %d, current angle = %s, next angle = %d, radius = %d, arcs searched = %d' % (
-                self.iteration,
-                self.angle,
-                next_angle,
-                self.radius,
-                self.arcs_searched))
-        waypoint = calc_position(
-                self.game_info.map_size,
-                target_position,
-                self.radius,
-                next_angle)
-        self.angle = next_angle
+        if self.index is None:
+            self.index = nearest_index(waypoints, observer.position)
+        self.index = (self.index + 1) % len(waypoints)
+        if log.enabled(DEBUG):
+            log.record(DEBUG, 'search_plan', iteration,
+                    tag=observer.tag,
+                    ring=self.ring,
+                    index=self.index,
+                    radius=self.radius,
+                    arcs_searched=self.arcs_searched)
         self.arcs_searched += 1
-        return waypoint
+        return waypoints[self.index]
 
-    def do(self, iteration, observer):
-        self.iteration = iteration
-        self.observer = observer
-        distance = self.observer.position.distance_to(self.location_position)
+    def do(self, log, iteration, observer):
+        distance = observer.position.distance_to(self.location_position)
         if distance <= (self.radius * 1.05):
             # start searching
-            next_waypoint = self.plan_base_search(self.location_position, self.observer.position)
-            print('iteration (%d): observer %d at (%d, %d) searching for base around start location %d at (%d, %d), heading to (%d, %d)' % (
-                        iteration,
-                        self.observer.tag,
-                        self.observer.position.x,
-                        self.observer.position.y,
-                        self.location_id,
-                        self.location_position.x,
-                        self.location_position.y,
-                        next_waypoint.x,
-                        next_waypoint.y),
-                        file=self.log)
+            next_waypoint = self.plan_base_search(log, iteration, observer)
+            if log.enabled(INFO):
+                log.record(INFO, 'observer_search', iteration,
+                        tag=observer.tag,
+                        position=observer.position,
+                        location_id=self.location_id,
+                        location_position=self.location_position,
+                        waypoint=next_waypoint)
         else:
             next_waypoint = self.location_position
-            print('iteration (%d): observer %d at (%d, %d) searching enemy start location %d at (%d, %d)' % (
-                        iteration,
-                        self.observer.tag,
-                        self.observer.position.x,
-                        self.observer.position.y,
-                        self.location_id,
-                        self.location_position.x,
-                        self.location_position.y),
-                        file=self.log)
-        return self.observer.move(next_waypoint)
+            if log.enabled(INFO):
+                log.record(INFO, 'observer_to_location', iteration,
+                        tag=observer.tag,
+                        position=observer.position,
+                        location_id=self.location_id,
+                        location_position=self.location_position)
+        return observer.move(next_waypoint)
 
 
 class VoidRaySwarm(sc2.BotAI):
-    def __init__(self, log):
+    def __init__(self, log, executor=None):
         self.log = log
         self.ITER_PER_PHASE = 150
         self.NEXUS_LIMIT = 5
         self.PATROL_RADIUS = 10
         self.PATROL_ARC_NUM = 8
+        self.STEP_BUDGET = 0.02
+        self.ATTACKER_CONFIG = {
+            STALKER: {'attack_size': 15, 'defend_size': 5},
+            VOIDRAY: {'attack_size': 16, 'defend_size': 3}
+        }
+        self.ENGAGE_RADIUS = 12
+        self.DEFEND_RADIUS = 50
+        self.REGROUP_RADIUS = 8
+        self.MAP_CACHE_DIR = map_cache.DEFAULT_CACHE_DIR
         self.BASE_NAMES = ['nexus', 'commandcenter', 'orbitalcommand', 'planetaryfortress', 'hatchery']
-        self.assigned_enemy_bases = {}
-        self.unassigned_enemy_bases = {}
-        self.assigned_enemy_locations = {}
-        self.unassigned_enemy_locations = {}
-        self.observer_assignment = {}
+        # three minutes of game time
+        self.BASE_EXPIRE_LOOPS = 4032
+        self.layout = None
+        self.waypoints = None
+        self.placement = PlacementGrid(self)
+        self.observers = ObserverPlanner(patrol=self.patrol_job, search=self.search_job)
+        self.ledger = ProductionLedger(self)
+        self.commands = CommandBuffer(self, ledger=self.ledger)
+        self.unit_index = UnitIndex(self)
+        self.targeting = TargetAssigner()
+        self.squads = SquadRoster(self.ATTACKER_CONFIG)
+        self.influence = InfluenceMap(self)
+        self.plans = PlanPool(executor)
+        self.visible_enemy_tags = set()
+        self.scheduler = Scheduler(budget=self.STEP_BUDGET)
+        self.scheduler.register('attack', self.attack, period=1, priority=CRITICAL)
+        self.scheduler.register('scout', self.scout, period=2, priority=HIGH,
+                triggers=(UNIT_CREATED, UNIT_DESTROYED, ENEMY_SPOTTED), trigger_types=(OBSERVER,))
+        self.scheduler.register('build_pylons', self.build_pylons, period=4, priority=HIGH,
+                triggers=(UNIT_CREATED,), trigger_types=(NEXUS, PYLON))
+        self.scheduler.register('build_workers', self.build_workers, period=2, priority=NORMAL,
+                triggers=(UNIT_CREATED,), trigger_types=(NEXUS, PROBE))
+        self.scheduler.register('build_army', self.build_army, period=2, priority=NORMAL,
+                triggers=(UNIT_CREATED,), trigger_types=(STARGATE, ROBOTICSFACILITY, VOIDRAY, OBSERVER))
+        self.scheduler.register('distribute_workers', self.distribute_workers, period=8, priority=NORMAL,
+                triggers=(UNIT_CREATED, UNIT_DESTROYED), trigger_types=(NEXUS, ASSIMILATOR))
+        self.scheduler.register('build_barracks', self.build_barracks, period=8, priority=NORMAL,
+                triggers=(UNIT_CREATED,), trigger_types=(PYLON, GATEWAY, CYBERNETICSCORE, ROBOTICSFACILITY, STARGATE))
+        self.scheduler.register('build_assimilator', self.build_assimilator, period=32, priority=LOW,
+                triggers=(UNIT_CREATED,), trigger_types=(NEXUS, ASSIMILATOR))
+        self.scheduler.register('expand', self.expand, period=32, priority=LOW)
+        self.scheduler.register('track_bases', self.track_bases, period=32, priority=LOW)
+
+    def on_start(self):
+        self.layout = MapLayout(self.game_info.map_name, cache_dir=self.MAP_CACHE_DIR)
+        self.layout.load_or_build(self)
+        self.waypoints = WaypointTable(
+                self.game_info.map_name,
+                self.game_info.playable_area,
+                spacing=self.PATROL_RADIUS,
+                arcs=self.PATROL_ARC_NUM,
+                cache_dir=self.MAP_CACHE_DIR)
+        self.waypoints.load_or_build(
+                lambda: list(self.enemy_start_locations) + [tuple(centre) for centre in self.layout.expansions])
+        self.ledger.seed()
 
     async def on_start_async(self):
-        self.unassigned_enemy_locations = { index : self.enemy_start_locations[index]
-            for index in range(0, len(self.enemy_start_locations))
-        }
+        for (index, location) in enumerate(self.enemy_start_locations):
+            self.observers.add_location(index, location)
+        for observer in self.unit_index(OBSERVER):
+            self.observers.add_observer(observer.tag)
+        for unit_type in self.ATTACKER_CONFIG:
+            for unit in self.unit_index(unit_type):
+                self.squads.add(unit.tag, unit_type)
 
     async def on_step(self, iteration):
         self.iteration = iteration
-        await self.scout()
-        await self.distribute_workers()
-        await self.build_workers()
-        await self.build_pylons()
-        await self.build_assimilator()
-        await self.expand()
-        await self.build_barracks()
-        await self.build_army()
-        await self.attack()
-
-    def register_enemy_bases(self):
-        unassigned = {}
-        active_bases = self.known_enemy_structures.filter(
-            lambda building: building.name.lower() in self.BASE_NAMES
-        )
-        for (observer_tag, assignment) in self.observer_assignment.items():
-            if isinstance(assignment, PatrolJob):
-                match = active_bases.find_by_tag(assignment.base_tag)
-                if match is None:
-                    unassigned[observer_tag] = assignment.base_tag
-        for (observer_tag, base_tag) in unassigned.items():
-            del self.observer_assignment[observer_tag]
-            del self.assigned_enemy_bases[base_tag]
-        for active in active_bases:
-            # TODO: Handle Terran structures that can move
-            if active.tag not in self.assigned_enemy_bases.keys():
-                self.unassigned_enemy_bases[active.tag] = active.position
-
-    def assess_enemy_locations(self):
-        if (len(self.unassigned_enemy_bases) == 0
-                or len(self.assigned_enemy_locations) == 0):
-            return
-        # TODO we should pick the closest observer for reassignment
-        chosen = None
-        job = None
-        for (observer_tag, assignment) in self.observer_assignment.items():
-            if isinstance(assignment, SearchJob):
-                chosen = observer_tag
-                job = assignment
-                break
-        if job is None or chosen is None:
-            return
-        self.unassigned_enemy_locations[job.location_id] = job.location_position
-        del self.assigned_enemy_locations[job.location_id]
-        del self.observer_assignment[chosen]
-
-    def assign_observer(self, observer):
-        if len(self.unassigned_enemy_bases) > 0:
-            (base_tag, base_position) = list(self.unassigned_enemy_bases.items())[0]
-            self.observer_assignment[observer.tag] = PatrolJob(
-                    log=self.log,
-                    game_info=self.game_info,
-                    observer=observer,
-                    base_tag=base_tag,
-                    base_position=base_position)
-            self.assigned_enemy_bases[base_tag] = base_position
-            del self.unassigned_enemy_bases[base_tag]
-        elif len(self.unassigned_enemy_locations) > 0:
-            (location_id, location_position) = list(self.unassigned_enemy_locations.items())[0]
-            self.observer_assignment[observer.tag] = SearchJob(
-                    log=self.log,
-                    game_info=self.game_info,
-                    observer=observer,
-                    location_id=location_id,
-                    location_position=location_position)
-            self.assigned_enemy_locations[location_id] = location_position
-            del self.unassigned_enemy_locations[location_id]
-
-    def audit_observers(self):
-        dead_observers = {}
-        alive_observers = self.units(OBSERVER)
-        for (observer_tag, assignment) in self.observer_assignment.items():
-            match = alive_observers.find_by_tag(observer_tag)
-            if match is None:
-                dead_observers[observer_tag] = assignment
-        for dead in dead_observers.keys():
-            del self.observer_assignment[dead]
-        for alive in alive_observers:
-            if alive.tag not in self.observer_assignment:
-                self.assign_observer(alive)
+        self.spot_enemies()
+        await self.scheduler.run(iteration)
+        await self.commands.flush()
+
+    def on_end(self, game_result):
+        self.plans.cancel()
+
+    async def on_unit_created(self, unit):
+        self.ledger.unit_created(unit)
+        if unit.type_id == OBSERVER:
+            self.observers.add_observer(unit.tag)
+        self.squads.add(unit.tag, unit.type_id)
+        self.scheduler.notify(UNIT_CREATED, unit.type_id)
+
+    async def on_building_construction_started(self, unit):
+        self.ledger.construction_started(unit)
+        self.scheduler.notify(UNIT_CREATED, unit.type_id)
+
+    async def on_unit_destroyed(self, unit_tag):
+        self.ledger.unit_destroyed(unit_tag)
+        self.observers.remove(unit_tag)
+        self.squads.remove(unit_tag)
+        self.influence.forget(unit_tag)
+        self.scheduler.notify(UNIT_DESTROYED)
+
+    def spot_enemies(self):
+        visible = self.known_enemy_units.tags
+        appeared = visible - self.visible_enemy_tags
+        if appeared:
+            self.scheduler.notify(ENEMY_SPOTTED)
+            for tag in appeared:
+                enemy = self.unit_index.find_enemy_by_tag(tag)
+                # TODO: Handle Terran structures that can move
+                if enemy.is_structure and enemy.name.lower() in self.BASE_NAMES:
+                    self.observers.add_base(tag, enemy.position, self.state.game_loop)
+        for tag in self.visible_enemy_tags - visible:
+            self.observers.remove(tag)
+        self.visible_enemy_tags = visible
+
+    async def track_bases(self):
+        # snapshots keep a base in known_enemy_units after it dies in the fog,
+        # so only a base that is actually in sight counts as still standing
+        game_loop = self.state.game_loop
+        for enemy in self.known_enemy_structures:
+            if enemy.is_visible and enemy.name.lower() in self.BASE_NAMES:
+                self.observers.add_base(enemy.tag, enemy.position, game_loop)
+        expired = self.observers.expire(game_loop, self.BASE_EXPIRE_LOOPS)
+        if expired and self.log.enabled(INFO):
+            self.log.record(INFO, 'bases_expired', self.iteration, tags=expired)
+
+    def patrol_job(self, base_tag, base_position):
+        return PatrolJob(
+                base_tag=base_tag,
+                base_position=base_position,
+                radius=self.PATROL_RADIUS,
+                ring=self.waypoints.rings(base_position)[0])
+
+    def search_job(self, location_id, location_position):
+        return SearchJob(
+                location_id=location_id,
+                location_position=location_position,
+                spacing=self.PATROL_RADIUS,
+                rings=self.waypoints.rings(location_position))
 
     async def scout(self):
-        self.register_enemy_bases()
-        self.assess_enemy_locations()
-        self.audit_observers()
-        idle_observers = self.units(OBSERVER).idle
+        self.observers.rebalance(self.unit_index.find_by_tag)
+        idle_observers = self.unit_index.idle(OBSERVER)
         for ob in idle_observers:
-            if ob.tag in self.observer_assignment:
-                assignment = self.observer_assignment[ob.tag]
-                order = assignment.do(self.iteration, ob)
-                await self.do(order)
+            assignment = self.observers.jobs.get(ob.tag)
+            if assignment is not None:
+                order = assignment.do(self.log, self.iteration, ob)
+                self.commands.add(order)
 
     async def build_workers(self):
-        worker_limit = len(self.units(NEXUS)) * 16
-        for nexus in self.units(NEXUS).ready.noqueue:
-            if self.can_afford(PROBE) and len(self.units(PROBE)) < worker_limit:
-                await self.do(nexus.train(PROBE))
+        worker_limit = len(self.unit_index(NEXUS)) * 16
+        for nexus in self.unit_index.ready_idle(NEXUS):
+            if self.can_afford(PROBE) and len(self.unit_index(PROBE)) < worker_limit:
+                self.commands.add(nexus.train(PROBE))
+
+    def layout_spot(self, building, spots_at, near):
+        for nexus in self.unit_index.ready(NEXUS):
+            for spot in spots_at(nexus.position):
+                if self.placement.can_place(building, spot):
+                    return spot
+        # a base off the layout, or every spot taken or unpowered; searching
+        # around near keeps the bot from being supply blocked for good
+        spot = self.placement.find_placement(building, near)
+        if self.log.enabled(INFO):
+            self.log.record(INFO, 'layout_exhausted', self.iteration,
+                    position=near,
+                    building=building.name,
+                    found=spot is not None)
+        return spot
+
+    def build_at(self, building, spot):
+        if spot is None:
+            return False
+        worker = self.select_build_worker(spot)
+        if worker is None or not self.commands.add(worker.build(building, spot)):
+            return False
+        self.placement.reserve(building, spot)
+        return True
 
     async def build_pylons(self):
         if ((self.supply_left < 5 or self.supply_used > self.supply_cap)
-                and not self.already_pending(PYLON)):
-            nexuses = self.units(NEXUS).ready
-            if nexuses.exists:
+                and not self.ledger.pending(PYLON)):
+            if self.unit_index.ready(NEXUS).exists:
                 if self.can_afford(PYLON):
-                    await self.build(PYLON, near=nexuses.first)
+                    self.build_at(PYLON, self.layout_spot(PYLON, self.layout.pylon_spots,
+                            self.unit_index.ready(NEXUS).first.position))
 
     async def build_assimilator(self):
-        for nexus in self.units(NEXUS).ready:
-            geysers = self.state.vespene_geyser.closer_than(15.0, nexus)
-            for geyser in geysers:
+        taken = {self.layout.key(assimilator.position) for assimilator in self.unit_index(ASSIMILATOR)}
+        geysers = None
+        for nexus in self.unit_index.ready(NEXUS):
+            for position in self.layout.geysers_at(nexus.position):
+                if self.layout.key(position) in taken:
+                    continue
                 if not self.can_afford(ASSIMILATOR):
-                    break
-                worker = self.select_build_worker(geyser.position)
+                    return
+                if geysers is None:
+                    geysers = {self.layout.key(geyser.position): geyser for geyser in self.state.vespene_geyser}
+                geyser = geysers.get(self.layout.key(position))
+                if geyser is None:
+                    continue
+                worker = self.select_build_worker(position)
                 if worker is None:
-                    break
-                elif not self.units(ASSIMILATOR).closer_than(1.0, geyser).exists:
-                    await self.do(worker.build(ASSIMILATOR, geyser))
+                    return
+                self.commands.add(worker.build(ASSIMILATOR, geyser))
+                taken.add(self.layout.key(position))
 
     async def build_barracks(self):
-        if self.units(PYLON).ready.exists:
-            pylon = self.units(PYLON).ready.random
-            print('DEBUG - iteration %d, cyberneticscore built = %d pending = %d, roboticsfacility built = %d pending = %d' % (
-                    self.iteration,
-                    len(self.units(CYBERNETICSCORE)),
-                    self.already_pending(CYBERNETICSCORE),
-                    len(self.units(ROBOTICSFACILITY)),
-                    self.already_pending(ROBOTICSFACILITY)))
-            if (self.units(CYBERNETICSCORE).ready.exists
-                    and len(self.units(ROBOTICSFACILITY)) < 1
+        if self.unit_index.ready(PYLON).exists:
+            pylon = self.unit_index.ready(PYLON).random.position
+            if self.log.enabled(DEBUG):
+                self.log.record(DEBUG, 'tech_status', self.iteration,
+                        cyberneticscore_built=self.unit_index.amount(CYBERNETICSCORE),
+                        cyberneticscore_pending=self.ledger.pending(CYBERNETICSCORE),
+                        roboticsfacility_built=self.unit_index.amount(ROBOTICSFACILITY),
+                        roboticsfacility_pending=self.ledger.pending(ROBOTICSFACILITY))
+            if (self.unit_index.ready(CYBERNETICSCORE).exists
+                    and len(self.unit_index(ROBOTICSFACILITY)) < 1
                     and self.can_afford(ROBOTICSFACILITY)
-                    and not self.already_pending(ROBOTICSFACILITY)):
-                await self.build(ROBOTICSFACILITY, near=pylon)
-            elif (self.units(CYBERNETICSCORE).ready.exists
-                    and len(self.units(STARGATE)) <= (self.iteration / self.ITER_PER_PHASE)
+                    and not self.ledger.pending(ROBOTICSFACILITY)):
+                self.build_at(ROBOTICSFACILITY, self.layout_spot(ROBOTICSFACILITY, self.layout.production_spots, pylon))
+            elif (self.unit_index.ready(CYBERNETICSCORE).exists
+                    and len(self.unit_index(STARGATE)) <= (self.iteration / self.ITER_PER_PHASE)
                     and self.can_afford(STARGATE)
-                    and not self.already_pending(STARGATE)):
-                await self.build(STARGATE, near=pylon)
-            elif (self.units(GATEWAY).ready.exists
-                    and not self.units(CYBERNETICSCORE)
+                    and not self.ledger.pending(STARGATE)):
+                self.build_at(STARGATE, self.layout_spot(STARGATE, self.layout.production_spots, pylon))
+            elif (self.unit_index.ready(GATEWAY).exists
+                    and not self.unit_index(CYBERNETICSCORE)
                     and self.can_afford(CYBERNETICSCORE)
-                    and not self.already_pending(CYBERNETICSCORE)):
-                await self.build(CYBERNETICSCORE, near=pylon)
-            elif (len(self.units(GATEWAY)) < 1
+                    and not self.ledger.pending(CYBERNETICSCORE)):
+                self.build_at(CYBERNETICSCORE, self.layout_spot(CYBERNETICSCORE, self.layout.production_spots, pylon))
+            elif (len(self.unit_index(GATEWAY)) < 1
                     and self.can_afford(GATEWAY)
-                    and not self.already_pending(GATEWAY)):
-                await self.build(GATEWAY, near=pylon)
+                    and not self.ledger.pending(GATEWAY)):
+                self.build_at(GATEWAY, self.layout_spot(GATEWAY, self.layout.production_spots, pylon))
 
     async def build_army(self):
-        print('DEBUG - iteration %d, observer amount = %d' % (
-                self.iteration,
-                self.units(OBSERVER).amount))
-        for rf in self.units(ROBOTICSFACILITY).ready.noqueue:
-            if ((self.units(OBSERVER).amount == 0 or len(self.unassigned_enemy_bases) > 0)
+        if self.log.enabled(DEBUG):
+            self.log.record(DEBUG, 'observer_status', self.iteration,
+                    observers=self.unit_index.amount(OBSERVER))
+        for rf in self.unit_index.ready_idle(ROBOTICSFACILITY):
+            if ((self.unit_index(OBSERVER).amount == 0 or len(self.observers.unassigned_bases) > 0)
                     and self.can_afford(OBSERVER)
                     and self.supply_left > 0):
-                await self.do(rf.train(OBSERVER))
-        for sg in self.units(STARGATE).ready.noqueue:
+                self.commands.add(rf.train(OBSERVER))
+        for sg in self.unit_index.ready_idle(STARGATE):
             if self.can_afford(VOIDRAY) and self.supply_left > 0:
-                await self.do(sg.train(VOIDRAY))
-
-    def find_target(self, state, attacker):
-        target = None
-        enemy_army = self.known_enemy_units.not_structure
-        if len(enemy_army) > 0:
-            target = enemy_army.closest_to(attacker)
-            print('iteration (%d): unit %d at (%d, %d) - attacking closest enemy unit name = %s, tag = %d, position = (%d, %d)' % (
-                    self.iteration,
-                    attacker.tag,
-                    attacker.position.x,
-                    attacker.position.y,
-                    target.name,
-                    target.tag,
-                    target.position.x,
-                    target.position.y),
-                    file=self.log)
-        elif len(self.known_enemy_structures) > 0:
-            target = self.known_enemy_structures.closest_to(attacker)
-            print('iteration (%d): unit %d at (%d, %d) - attacking closest enemy structure name = %s, tag = %d, position = (%d, %d)' % (
-                    self.iteration,
-                    attacker.tag,
-                    attacker.position.x,
-                    attacker.position.y,
-                    target.name,
-                    target.tag,
-                    target.position.x,
-                    target.position.y),
-                    file=self.log)
+                self.commands.add(sg.train(VOIDRAY))
+
+    def squad_target(self, squad, members):
+        # one decision for the whole squad, the nearest enemy cluster it can
+        # beat according to the influence map; members share out the enemies
+        # around that cluster
+        position = self.influence.weakest_cluster(squad.centroid, self.influence.strength_of(members))
+        if position is None:
+            squad.target = self.enemy_start_locations[0]
+            if self.log.enabled(INFO):
+                self.log.record(INFO, 'attack_start_location', self.iteration,
+                        squad_id=squad.squad_id,
+                        size=len(squad.members),
+                        position=squad.centroid,
+                        target_position=squad.target)
+            return {}
+        (kind, anchor) = ('unit', self.unit_index.enemy_grid(structure=False).nearest(position))
+        if anchor is None or anchor.distance_to(position) > self.ENGAGE_RADIUS:
+            (kind, anchor) = ('structure', self.unit_index.enemy_grid(structure=True).nearest(position))
+        if anchor is None or anchor.distance_to(position) > self.ENGAGE_RADIUS:
+            # only a remembered sighting, attack move there
+            squad.target = position
+            if self.log.enabled(INFO):
+                self.log.record(INFO, 'attack_position', self.iteration,
+                        squad_id=squad.squad_id,
+                        size=len(squad.members),
+                        position=squad.centroid,
+                        target_position=position)
+            return {}
+        squad.target = anchor.tag
+        nearby = self.unit_index.enemy_grid(structure=(kind == 'structure')).within(anchor.position, self.ENGAGE_RADIUS)
+        if self.log.enabled(INFO):
+            self.log.record(INFO, 'attack_' + kind, self.iteration,
+                    squad_id=squad.squad_id,
+                    size=len(squad.members),
+                    position=squad.centroid,
+                    target_name=anchor.name,
+                    target_tag=anchor.tag,
+                    target_position=anchor.position,
+                    engaged=len(nearby))
+        return self.assign_targets(squad, members, nearby)
+
+    def assign_targets(self, squad, members, enemies):
+        if not self.plans.offloaded:
+            return self.targeting.assign(members, enemies)
+        # the squad goes for its target now, the plan is applied when it
+        # arrives, provided the squad is still after the same target
+        enemies = list(enemies)
+        if members and enemies:
+            self.plans.submit(('squad', squad.squad_id),
+                    (self.iteration, squad.target, [u.tag for u in members], [enemy.tag for enemy in enemies]),
+                    self.targeting.plan, self.targeting.features(members, enemies))
+        return {}
+
+    def apply_plans(self):
+        for ((_, squad_id), ((iteration, target, member_tags, enemy_tags), assignment)) in self.plans.take_all('squad'):
+            squad = self.squads.squads.get(squad_id)
+            if squad is None or squad.target != target:
+                continue
+            if self.log.enabled(DEBUG):
+                self.log.record(DEBUG, 'plan_applied', self.iteration,
+                        squad_id=squad_id,
+                        planned_at=iteration,
+                        size=len(member_tags))
+            for (tag, index) in zip(member_tags, assignment.tolist()):
+                if index < 0 or tag not in squad.members:
+                    continue
+                unit = self.unit_index.find_by_tag(tag)
+                enemy = self.unit_index.find_enemy_by_tag(enemy_tags[index])
+                if unit is not None and enemy is not None:
+                    self.commands.add(unit.attack(enemy))
+
+    def order_attack(self, squad, members):
+        target = squad.target
+        if target is not None and not isinstance(target, Point2):
+            target = self.unit_index.find_enemy_by_tag(target)
+        idle = [u for u in members if u.is_idle]
+        if target is None or len(idle) == len(members):
+            targets = self.squad_target(squad, members)
+            fallback = squad.target
+            if not isinstance(fallback, Point2):
+                fallback = self.unit_index.find_enemy_by_tag(fallback)
+            for u in members:
+                self.commands.add(u.attack(targets.get(u.tag, fallback)))
         else:
-            target = self.enemy_start_locations[0]
-            print('iteration (%d): unit %d at (%d, %d) - attacking default enemy start position at (%d, %d)' % (
-                    self.iteration,
-                    attacker.tag,
-                    attacker.position.x,
-                    attacker.position.y,
-                    target.x,
-                    target.y),
-                    file=self.log)
-        return target
+            for u in members:
+                if u.tag in squad.fresh or u.is_idle:
+                    self.commands.add(u.attack(target))
 
-    async def attack(self):
-        attacker_config = {
-            STALKER: {'attack_size': 15, 'defend_size': 5},
-            VOIDRAY: {'attack_size': 16, 'defend_size': 3}
-        }
+    def order_defend(self, squad, members):
+        nexus = self.unit_index.find_by_tag(squad.target)
+        if nexus is None or self.influence.threat_near([nexus.position], self.DEFEND_RADIUS)[0] <= 0:
+            # nothing left to defend against, back to the reserve
+            self.squads.disband(squad)
+            return
+        if not squad.fresh and not any(u.is_idle for u in members):
+            return
+        threats = self.unit_index.enemy_grid().within(nexus.position, self.DEFEND_RADIUS)
+        targets = self.assign_targets(squad, members, threats)
+        for u in members:
+            target = targets.get(u.tag)
+            if target is None:
+                continue
+            if self.log.enabled(INFO):
+                self.log.record(INFO, 'defend', self.iteration,
+                        tag=u.tag,
+                        squad_id=squad.squad_id,
+                        position=u.position,
+                        target_name=target.name,
+                        target_tag=target.tag,
+                        target_position=target.position,
+                        nexus_distance=nexus.position.distance_to(target.position))
+            self.commands.add(u.attack(target))
+
+    def order_reinforce(self, squad, members):
+        leader = self.squads.squads.get(squad.target)
+        if leader is None or leader.centroid is None:
+            self.squads.disband(squad)
+            return
+        if squad.centroid.distance_to(leader.centroid) <= self.REGROUP_RADIUS:
+            if self.log.enabled(INFO):
+                self.log.record(INFO, 'reinforce_join', self.iteration,
+                        squad_id=squad.squad_id,
+                        size=len(squad.members),
+                        position=squad.centroid,
+                        leader_id=leader.squad_id)
+            self.squads.merge(squad, leader)
+            return
+        if not squad.fresh and not any(u.is_idle for u in members):
+            return
+        if self.log.enabled(INFO):
+            self.log.record(INFO, 'reinforce_move', self.iteration,
+                    squad_id=squad.squad_id,
+                    size=len(squad.members),
+                    position=squad.centroid,
+                    leader_id=leader.squad_id,
+                    target_position=leader.centroid)
+        for u in members:
+            # attack move so the reinforcements fight their way through
+            self.commands.add(u.attack(leader.centroid))
+
+    def threatened_nexus(self, nexuses, unit):
+        # the most threatened nexus no squad of this type is defending yet,
+        # or the most threatened one if they all are
+        threat = self.influence.threat_near([nexus.position for nexus in nexuses], self.DEFEND_RADIUS)
+        threatened = sorted(
+                (index for index in range(len(nexuses)) if threat[index] > 0),
+                key=lambda index: -threat[index])
+        if not threatened:
+            return None
+        defended = {squad.target for squad in self.squads.of_type(unit, DEFEND)}
+        for index in threatened:
+            if nexuses[index].tag not in defended:
+                return nexuses[index]
+        return nexuses[threatened[0]]
+
+    def form_squads(self):
+        nexuses = self.unit_index(NEXUS)
+        for (unit, config) in self.ATTACKER_CONFIG.items():
+            reserve = self.squads.reserves[unit]
+            if len(reserve) == 0:
+                continue
+            if len(reserve) > config['attack_size'] or nexuses.amount == 0:
+                self.squads.form(unit, ATTACK)
+            elif len(reserve) > config['defend_size']:
+                nexus = self.threatened_nexus(nexuses, unit)
+                if nexus is not None:
+                    self.squads.form(unit, DEFEND, target=nexus.tag)
+            else:
+                attackers = self.squads.of_type(unit, ATTACK)
+                if attackers:
+                    leader = max(attackers, key=lambda squad: len(squad.members))
+                    self.squads.form(unit, REINFORCE, target=leader.squad_id)
 
-        for unit, config in attacker_config.items():
-            unit_group = self.units(unit)
-            idle_units = unit_group.idle
-            busy_units = unit_group - idle_units
-            busy_count = len(busy_units)
-            idle_count = len(idle_units)
-
-            if (idle_count > config['attack_size']
-                    or (self.units(NEXUS).amount == 0 and self.units(unit).amount > 0)):
-                target = self.find_target(self.state, self.units(unit).first)
-                for u in idle_units:
-                    await self.do(u.attack(target))
-            elif idle_count > config['defend_size']:
-                main_nexus = self.units(NEXUS).first
-                if len(self.known_enemy_units) > 0:
-                    enemy_by_distance = sorted(
-                            self.known_enemy_units,
-                            key=lambda enemy: enemy.position.distance_to(main_nexus.position))
-                    closest_enemy = enemy_by_distance[0]
-                    distance = main_nexus.position.distance_to(closest_enemy.position)
-                    if distance <= 50:
-                        for u in idle_units:
-                            print('iteration (%d): unit %d at (%d, %d) - defending against: name = %s, tag = %d, position = (%d, %d), distance to nexus = %d' % (
-                                    self.iteration,
-                                    u.tag,
-                                    u.position.x,
-                                    u.position.y,
-                                    closest_enemy.name,
-                                    closest_enemy.tag,
-                                    closest_enemy.position.x,
-                                    closest_enemy.position.y,
-                                    distance),
-                                    file=self.log)
-                            await self.do(u.attack(closest_enemy))
-            elif busy_count > 0:
-                for u in idle_units:
-                    squad_mate = busy_units.closest_to(u)
-                    target = squad_mate.order_target
-                    if isinstance(target, Point2):
-                        print('iteration (%d): unit %d at (%d, %d) - moving with (%d) at (%d, %d) to position at (%d, %d)' % (
-                                self.iteration,
-                                u.tag,
-                                u.position.x,
-                                u.position.y,
-                                squad_mate.tag,
-                                squad_mate.position.x,
-                                squad_mate.position.y,
-                                target.x,
-                                target.y),
-                                file=self.log)
-                    else:
-                        enemy = target
-                        target = self.known_enemy_units.find_by_tag(enemy)
-                        if target is None:
-                            print('iteration (%d): unit %d at (%d, %d) - order target (%d) no longer exists' % (
-                                    self.iteration,
-                                    u.tag,
-                                    u.position.x,
-                                    u.position.y,
-                                    enemy),
-                                    file=self.log)
-                            return
-                        else:
-                            print('iteration (%d): unit %d at (%d, %d) - assisting (%d) at (%d, %d) attack: name = %s, tag = %d, position = (%d, %d)' % (
-                                    self.iteration,
-                                    u.tag,
-                                    u.position.x,
-                                    u.position.y,
-                                    squad_mate.tag,
-                                    squad_mate.position.x,
-                                    squad_mate.position.y,
-                                    target.name,
-                                    target.tag,
-                                    target.position.x,
-                                    target.position.y),
-                                    file=self.log)
-                    await self.do(u.attack(target))
+    async def attack(self):
+        self.form_squads()
+        self.squads.update(self.unit_index.find_by_tag)
+        self.apply_plans()
+        orders = {ATTACK: self.order_attack, DEFEND: self.order_defend, REINFORCE: self.order_reinforce}
+        for squad in list(self.squads.squads.values()):
+            if squad.squad_id not in self.squads.squads:
+                # merged into another squad earlier in this pass
+                continue
+            members = [self.unit_index.find_by_tag(tag) for tag in squad.members]
+            orders[squad.role](squad, members)
+            squad.fresh.clear()
 
     async def expand(self):
-        if (self.units(NEXUS).amount < (self.iteration / (self.ITER_PER_PHASE * 2))
-                and self.units(NEXUS).amount < self.NEXUS_LIMIT
+        if (self.unit_index(NEXUS).amount < (self.iteration / (self.ITER_PER_PHASE * 2))
+                and self.unit_index(NEXUS).amount < self.NEXUS_LIMIT
                 and self.can_afford(NEXUS)
-                and not self.already_pending(NEXUS)):
-            await self.expand_now()
\ No newline at end of file
+                and not self.ledger.pending(NEXUS)):
+            # inline even in real time, the client has one websocket and no
+            # lock, so a query racing the game loop's requests breaks it
+            location = await self.next_expansion()
+            if location is not None:
+                self.build_at(NEXUS, self.placement.find_placement(NEXUS, location, max_distance=10))
+
+    async def next_expansion(self):
+        # expand_now goes around the command buffer and the ledger, and asks
+        # for one path per expansion, so this ranks them in a single query
+        townhalls = self.townhalls
+        free = [
+            Point2((float(x), float(y)))
+            for (x, y) in self.layout.expansions.tolist()
+            if not townhalls.closer_than(self.EXPANSION_GAP_THRESHOLD, Point2((x, y))).exists
+        ]
+        if not free:
+            return None
+        start = self.game_info.player_start_location
+        distances = await self._client.query_pathings([[start, location] for location in free])
+        # zero is the answer for no path
+        reachable = [(distance, location) for (distance, location) in zip(distances, free) if distance > 0]
+        if not reachable:
+            return None
+        return min(reachable, key=lambda pair: pair[0])[1]
\ No newline at end of file
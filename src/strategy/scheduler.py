@@ -0,0 +1,72 @@
+import time
+
+
+UNIT_CREATED = 'unit_created'
+UNIT_DESTROYED = 'unit_destroyed'
+ENEMY_SPOTTED = 'enemy_spotted'
+
+CRITICAL = 0
+HIGH = 1
+NORMAL = 2
+LOW = 3
+
+
+class Task():
+    def __init__(self, name, action, period, priority, triggers, trigger_types):
+        self.name = name
+        self.action = action
+        self.period = period
+        self.priority = priority
+        self.triggers = frozenset(triggers)
+        self.trigger_types = None if trigger_types is None else frozenset(trigger_types)
+        self.next_iteration = 0
+        self.triggered = False
+        self.deferrals = 0
+
+    def is_due(self, iteration):
+        return self.triggered or iteration >= self.next_iteration
+
+
+class Scheduler():
+    def __init__(self, budget=None, max_deferrals=8):
+        self.budget = budget
+        self.max_deferrals = max_deferrals
+        self.tasks = []
+        self.deferred = 0
+
+    def register(self, name, action, period=1, priority=NORMAL, triggers=(), trigger_types=None):
+        task = Task(name, action, period, priority, triggers, trigger_types)
+        self.tasks.append(task)
+        self.tasks.sort(key=lambda task: task.priority)
+        return task
+
+    def notify(self, event, unit_type=None):
+        for task in self.tasks:
+            if event not in task.triggers:
+                continue
+            # an event about one unit only wakes tasks that care about its type
+            if (unit_type is not None
+                    and task.trigger_types is not None
+                    and unit_type not in task.trigger_types):
+                continue
+            task.triggered = True
+
+    def must_run(self, task):
+        return task.priority == CRITICAL or task.deferrals >= self.max_deferrals
+
+    async def run(self, iteration):
+        start = time.perf_counter()
+        for task in self.tasks:
+            if not task.is_due(iteration):
+                continue
+            if (self.budget is not None
+                    and not self.must_run(task)
+                    and time.perf_counter() - start >= self.budget):
+                # stays due, so it runs on the next step with budget to spare
+                task.deferrals += 1
+                self.deferred += 1
+                continue
+            task.triggered = False
+            task.deferrals = 0
+            task.next_iteration = iteration + task.period
+            await task.action()
@@ -0,0 +1,142 @@
+import numpy as np
+
+
+def nearest_pairs(sources, targets):
+    # greedy matching, always taking the closest remaining pair
+    distances = np.linalg.norm(sources[:, None, :] - targets[None, :, :], axis=2)
+    pairs = []
+    for _ in range(min(len(sources), len(targets))):
+        (source, target) = np.unravel_index(np.argmin(distances), distances.shape)
+        pairs.append((int(source), int(target)))
+        distances[source, :] = np.inf
+        distances[:, target] = np.inf
+    return pairs
+
+
+class ObserverPlanner():
+    def __init__(self, patrol, search):
+        self.patrol = patrol
+        self.search = search
+        self.jobs = {}
+        self.assignments = {}
+        self.free_observers = {}
+        self.bases = {}
+        self.base_seen = {}
+        self.locations = {}
+        self.unassigned_bases = {}
+        self.unassigned_locations = {}
+        self.base_observers = {}
+        self.location_observers = {}
+        self.dirty = False
+
+    def add_observer(self, tag):
+        if tag in self.jobs or tag in self.free_observers:
+            return
+        self.free_observers[tag] = None
+        self.dirty = True
+
+    def add_base(self, tag, position, game_loop=0):
+        if tag in self.bases:
+            self.base_seen[tag] = game_loop
+            return
+        self.bases[tag] = position
+        self.base_seen[tag] = game_loop
+        self.unassigned_bases[tag] = position
+        self.dirty = True
+
+    def add_location(self, location_id, position):
+        self.locations[location_id] = position
+        self.unassigned_locations[location_id] = position
+        self.dirty = True
+
+    def remove(self, tag):
+        if tag in self.free_observers:
+            del self.free_observers[tag]
+        elif tag in self.jobs:
+            self.release(tag)
+            del self.free_observers[tag]
+        elif tag in self.bases:
+            del self.bases[tag]
+            del self.base_seen[tag]
+            self.unassigned_bases.pop(tag, None)
+            observer = self.base_observers.pop(tag, None)
+            if observer is not None:
+                del self.jobs[observer]
+                del self.assignments[observer]
+                self.free_observers[observer] = None
+        else:
+            return
+        self.dirty = True
+
+    def expire(self, game_loop, max_age):
+        # a base nobody has laid eyes on for max_age game loops is most likely
+        # a snapshot of something long gone, so it stops drawing an observer
+        expired = [tag for (tag, seen) in self.base_seen.items() if game_loop - seen > max_age]
+        for tag in expired:
+            self.remove(tag)
+        return expired
+
+    def release(self, observer):
+        # the observer's target goes back into the pool, the observer becomes free
+        (kind, key) = self.assignments.pop(observer)
+        del self.jobs[observer]
+        if kind == 'base':
+            del self.base_observers[key]
+            self.unassigned_bases[key] = self.bases[key]
+        else:
+            self.unassigned_locations[key] = self.locations[key]
+            del self.location_observers[key]
+        self.free_observers[observer] = None
+
+    def assign_base(self, observer, base_tag):
+        position = self.unassigned_bases.pop(base_tag)
+        del self.free_observers[observer]
+        self.jobs[observer] = self.patrol(base_tag, position)
+        self.assignments[observer] = ('base', base_tag)
+        self.base_observers[base_tag] = observer
+
+    def assign_location(self, observer, location_id):
+        position = self.unassigned_locations.pop(location_id)
+        del self.free_observers[observer]
+        self.jobs[observer] = self.search(location_id, position)
+        self.assignments[observer] = ('location', location_id)
+        self.location_observers[location_id] = observer
+
+    def positions(self, tags, locate):
+        found = []
+        points = []
+        for tag in tags:
+            unit = locate(tag)
+            if unit is not None:
+                found.append(tag)
+                points.append(unit.position)
+        return (found, np.array(points, dtype=float).reshape(-1, 2))
+
+    def match(self, targets, assign, locate):
+        if len(self.free_observers) == 0 or len(targets) == 0:
+            return
+        (observers, sources) = self.positions(list(self.free_observers), locate)
+        keys = list(targets)
+        points = np.array([targets[key] for key in keys], dtype=float).reshape(-1, 2)
+        for (source, target) in nearest_pairs(sources, points):
+            assign(observers[source], keys[target])
+
+    def rebalance(self, locate):
+        if not self.dirty:
+            return False
+        self.dirty = False
+        for tag in list(self.free_observers):
+            if locate(tag) is None:
+                del self.free_observers[tag]
+        self.match(self.unassigned_bases, self.assign_base, locate)
+        if len(self.unassigned_bases) > 0 and len(self.location_observers) > 0:
+            # a known base is worth more than a guessed location, so pull the
+            # searchers closest to the uncovered bases off their search
+            (searchers, sources) = self.positions(list(self.location_observers.values()), locate)
+            keys = list(self.unassigned_bases)
+            points = np.array([self.unassigned_bases[key] for key in keys], dtype=float).reshape(-1, 2)
+            for (source, target) in nearest_pairs(sources, points):
+                self.release(searchers[source])
+                self.assign_base(searchers[source], keys[target])
+        self.match(self.unassigned_locations, self.assign_location, locate)
+        return True
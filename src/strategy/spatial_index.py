@@ -0,0 +1,98 @@
+import heapq
+import math
+
+
+class SpatialIndex():
+    def __init__(self, units, cell_size=8.0):
+        self.cell_size = cell_size
+        self.cells = {}
+        self.count = 0
+        for unit in units:
+            position = unit.position
+            self.insert(unit, position.x, position.y)
+
+    def __len__(self):
+        return self.count
+
+    def cell_of(self, x, y):
+        return (int(math.floor(x / self.cell_size)), int(math.floor(y / self.cell_size)))
+
+    def insert(self, unit, x, y):
+        key = self.cell_of(x, y)
+        bucket = self.cells.get(key)
+        if bucket is None:
+            self.cells[key] = [(x, y, unit)]
+        else:
+            bucket.append((x, y, unit))
+        if self.count == 0:
+            self.min_cell = list(key)
+            self.max_cell = list(key)
+        else:
+            self.min_cell[0] = min(self.min_cell[0], key[0])
+            self.min_cell[1] = min(self.min_cell[1], key[1])
+            self.max_cell[0] = max(self.max_cell[0], key[0])
+            self.max_cell[1] = max(self.max_cell[1], key[1])
+        self.count += 1
+
+    def ring(self, centre, radius):
+        (cx, cy) = centre
+        if radius == 0:
+            yield centre
+            return
+        for dx in range(-radius, radius + 1):
+            yield (cx + dx, cy - radius)
+            yield (cx + dx, cy + radius)
+        for dy in range(-radius + 1, radius):
+            yield (cx - radius, cy + dy)
+            yield (cx + radius, cy + dy)
+
+    def max_ring(self, centre):
+        return max(
+                centre[0] - self.min_cell[0],
+                self.max_cell[0] - centre[0],
+                centre[1] - self.min_cell[1],
+                self.max_cell[1] - centre[1])
+
+    def k_nearest(self, position, k):
+        if self.count == 0 or k <= 0:
+            return []
+        centre = self.cell_of(position.x, position.y)
+        # max-heap of the k closest entries seen so far, keyed by negated squared distance
+        closest = []
+        for radius in range(0, self.max_ring(centre) + 1):
+            for cell in self.ring(centre, radius):
+                for (x, y, unit) in self.cells.get(cell, ()):
+                    dx = x - position.x
+                    dy = y - position.y
+                    entry = (-(dx * dx + dy * dy), id(unit), unit)
+                    if len(closest) < k:
+                        heapq.heappush(closest, entry)
+                    elif entry[0] > closest[0][0]:
+                        heapq.heapreplace(closest, entry)
+            # anything outside the rings scanned so far is at least this far away
+            bound = radius * self.cell_size
+            if len(closest) == k and -closest[0][0] <= bound * bound:
+                break
+        return [unit for (_, _, unit) in sorted(closest, reverse=True)]
+
+    def nearest(self, position):
+        found = self.k_nearest(position, 1)
+        if len(found) == 0:
+            return None
+        return found[0]
+
+    def within(self, position, radius):
+        if self.count == 0:
+            return []
+        (low_x, low_y) = self.cell_of(position.x - radius, position.y - radius)
+        (high_x, high_y) = self.cell_of(position.x + radius, position.y + radius)
+        limit = radius * radius
+        found = []
+        for cell_x in range(max(low_x, self.min_cell[0]), min(high_x, self.max_cell[0]) + 1):
+            for cell_y in range(max(low_y, self.min_cell[1]), min(high_y, self.max_cell[1]) + 1):
+                for (x, y, unit) in self.cells.get((cell_x, cell_y), ()):
+                    dx = x - position.x
+                    dy = y - position.y
+                    if dx * dx + dy * dy <= limit:
+                        found.append(unit)
+        return found
@@ -0,0 +1,102 @@
+from sc2.position import Point2
+
+
+ATTACK = 'attack'
+DEFEND = 'defend'
+REINFORCE = 'reinforce'
+
+
+class Squad():
+    __slots__ = ('squad_id', 'unit_type', 'role', 'members', 'target', 'centroid', 'fresh')
+
+    def __init__(self, squad_id, unit_type, role, target=None):
+        self.squad_id = squad_id
+        self.unit_type = unit_type
+        self.role = role
+        self.members = set()
+        self.target = target
+        self.centroid = None
+        # members that joined since the squad last gave its orders
+        self.fresh = set()
+
+
+class SquadRoster():
+    def __init__(self, unit_types):
+        self.next_id = 0
+        self.squads = {}
+        self.squad_of = {}
+        self.unit_types = {}
+        # units of each type that are not in a squad, in the order they arrived
+        self.reserves = {unit_type: {} for unit_type in unit_types}
+
+    def add(self, tag, unit_type):
+        if unit_type not in self.reserves or tag in self.unit_types:
+            return
+        self.unit_types[tag] = unit_type
+        self.reserves[unit_type][tag] = None
+
+    def remove(self, tag):
+        unit_type = self.unit_types.pop(tag, None)
+        if unit_type is None:
+            return
+        squad_id = self.squad_of.pop(tag, None)
+        if squad_id is None:
+            del self.reserves[unit_type][tag]
+            return
+        squad = self.squads[squad_id]
+        squad.members.discard(tag)
+        squad.fresh.discard(tag)
+        if not squad.members:
+            del self.squads[squad_id]
+
+    def form(self, unit_type, role, target=None):
+        # every reserve unit of the type becomes one squad
+        squad = Squad(self.next_id, unit_type, role, target)
+        self.next_id += 1
+        self.squads[squad.squad_id] = squad
+        reserve = self.reserves[unit_type]
+        self.join(squad, list(reserve))
+        reserve.clear()
+        return squad
+
+    def join(self, squad, tags):
+        for tag in tags:
+            self.squad_of[tag] = squad.squad_id
+            squad.members.add(tag)
+            squad.fresh.add(tag)
+
+    def merge(self, squad, into):
+        self.join(into, squad.members)
+        del self.squads[squad.squad_id]
+
+    def disband(self, squad):
+        reserve = self.reserves[squad.unit_type]
+        for tag in squad.members:
+            del self.squad_of[tag]
+            reserve[tag] = None
+        del self.squads[squad.squad_id]
+
+    def of_type(self, unit_type, role):
+        return [
+            squad
+            for squad in self.squads.values()
+            if squad.unit_type == unit_type and squad.role == role
+        ]
+
+    def update(self, locate):
+        # centroids from the live units, dropping any tag the state no longer has
+        for squad in list(self.squads.values()):
+            x = 0.0
+            y = 0.0
+            count = 0
+            for tag in list(squad.members):
+                unit = locate(tag)
+                if unit is None:
+                    self.remove(tag)
+                    continue
+                position = unit.position
+                x += position.x
+                y += position.y
+                count += 1
+            if count > 0:
+                squad.centroid = Point2((x / count, y / count))
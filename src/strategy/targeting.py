@@ -0,0 +1,93 @@
+import numpy as np
+
+
+class TargetAssigner():
+    def __init__(self, max_per_target=6, horizon=3.0, threat_bonus=8.0, damage_bonus=6.0):
+        self.max_per_target = max_per_target
+        self.horizon = horizon
+        self.threat_bonus = threat_bonus
+        self.damage_bonus = damage_bonus
+
+    def positions(self, units):
+        return np.array([(unit.position.x, unit.position.y) for unit in units], dtype=np.float64).reshape(-1, 2)
+
+    def features(self, attackers, enemies):
+        # plain arrays, so planning can run away from the units and the game loop
+        return {
+            'attacker_xy': self.positions(attackers),
+            'hits_air': np.array([attacker.can_attack_air for attacker in attackers], dtype=bool),
+            'hits_ground': np.array([attacker.can_attack_ground for attacker in attackers], dtype=bool),
+            'dps': np.array([max(attacker.ground_dps, attacker.air_dps) for attacker in attackers], dtype=np.float64),
+            'enemy_xy': self.positions(enemies),
+            'flying': np.array([enemy.is_flying for enemy in enemies], dtype=bool),
+            'threat': np.array([enemy.can_attack for enemy in enemies], dtype=np.float64),
+            'vitality': np.array([enemy.health + enemy.shield for enemy in enemies], dtype=np.float64),
+            'vitality_max': np.array([enemy.health_max + enemy.shield_max for enemy in enemies], dtype=np.float64),
+        }
+
+    def cost_matrix(self, features):
+        delta = features['attacker_xy'][:, np.newaxis, :] - features['enemy_xy'][np.newaxis, :, :]
+        distance = np.sqrt(np.einsum('ijk,ijk->ij', delta, delta))
+        valid = np.where(features['flying'][np.newaxis, :],
+                features['hits_air'][:, np.newaxis],
+                features['hits_ground'][:, np.newaxis])
+        damaged = 1.0 - features['vitality'] / np.maximum(features['vitality_max'], 1.0)
+        priority = self.threat_bonus * features['threat'] + self.damage_bonus * damaged
+        cost = distance - priority[np.newaxis, :]
+        cost[~valid] = np.inf
+        return cost
+
+    def capacity(self, features):
+        # enough attackers to kill each target within the horizon, and no more
+        damage = max(float(features['dps'].mean()) * self.horizon, 1.0)
+        return np.clip(np.ceil(features['vitality'] / damage), 1, self.max_per_target).astype(np.int64)
+
+    def assign_greedy(self, cost, capacity):
+        (attacker_count, enemy_count) = cost.shape
+        assignment = np.full(attacker_count, -1, dtype=np.int64)
+        remaining = capacity.copy()
+        reachable = np.isfinite(cost).any(axis=1)
+        while True:
+            pending = np.flatnonzero((assignment < 0) & reachable)
+            if len(pending) == 0:
+                break
+            open_cost = np.where(remaining[np.newaxis, :] > 0, cost[pending], np.inf)
+            choice = open_cost.argmin(axis=1)
+            choice_cost = open_cost[np.arange(len(pending)), choice]
+            usable = np.isfinite(choice_cost)
+            if not usable.any():
+                if (remaining == capacity).all():
+                    reachable[pending] = False
+                else:
+                    # every reachable target is saturated, let the surplus pile on again
+                    remaining = capacity.copy()
+                continue
+            pending = pending[usable]
+            choice = choice[usable]
+            choice_cost = choice_cost[usable]
+            # each target accepts its cheapest suitors up to its remaining capacity
+            order = np.lexsort((choice_cost, choice))
+            ranked_choice = choice[order]
+            first = np.searchsorted(ranked_choice, ranked_choice, side='left')
+            rank = np.arange(len(order)) - first
+            accepted = rank < remaining[ranked_choice]
+            assignment[pending[order[accepted]]] = ranked_choice[accepted]
+            remaining -= np.bincount(ranked_choice[accepted], minlength=enemy_count)
+        return assignment
+
+    def plan(self, features):
+        # the attacker to enemy index assignment, -1 where nothing is reachable
+        cost = self.cost_matrix(features)
+        return self.assign_greedy(cost, self.capacity(features))
+
+    def assign(self, attackers, enemies):
+        attackers = list(attackers)
+        enemies = list(enemies)
+        if len(attackers) == 0 or len(enemies) == 0:
+            return {}
+        assignment = self.plan(self.features(attackers, enemies))
+        return {
+            attacker.tag: enemies[index]
+            for (attacker, index) in zip(attackers, assignment.tolist())
+            if index >= 0
+        }
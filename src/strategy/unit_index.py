@@ -0,0 +1,82 @@
+from sc2.units import Units
+
+from strategy.spatial_index import SpatialIndex
+
+
+class UnitIndex():
+    def __init__(self, bot):
+        self.bot = bot
+        self.state = None
+        self.by_type = {}
+        self.by_tag = {}
+        self.enemy_by_tag = None
+        self.selections = {}
+
+    def refresh(self):
+        # the bot swaps in a new GameState object every step
+        if self.bot.state is self.state:
+            return
+        self.state = self.bot.state
+        self.by_type = {}
+        self.by_tag = {}
+        self.enemy_by_tag = None
+        self.selections = {}
+        for unit in self.bot.units:
+            self.by_tag[unit.tag] = unit
+            group = self.by_type.get(unit.type_id)
+            if group is None:
+                self.by_type[unit.type_id] = [unit]
+            else:
+                group.append(unit)
+
+    def select(self, type_id, ready=False, idle=None):
+        self.refresh()
+        key = (type_id, ready, idle)
+        selection = self.selections.get(key)
+        if selection is None:
+            units = self.by_type.get(type_id, ())
+            if ready:
+                units = [unit for unit in units if unit.is_ready]
+            if idle is not None:
+                units = [unit for unit in units if unit.is_idle == idle]
+            selection = Units(units)
+            self.selections[key] = selection
+        return selection
+
+    def __call__(self, type_id):
+        return self.select(type_id)
+
+    def ready(self, type_id):
+        return self.select(type_id, ready=True)
+
+    def idle(self, type_id):
+        return self.select(type_id, idle=True)
+
+    def ready_idle(self, type_id):
+        return self.select(type_id, ready=True, idle=True)
+
+    def enemy_grid(self, structure=None):
+        self.refresh()
+        key = ('enemy_grid', structure)
+        grid = self.selections.get(key)
+        if grid is None:
+            enemies = self.bot.known_enemy_units
+            if structure is not None:
+                enemies = enemies.filter(lambda enemy: enemy.is_structure == structure)
+            grid = SpatialIndex(enemies)
+            self.selections[key] = grid
+        return grid
+
+    def amount(self, type_id):
+        self.refresh()
+        return len(self.by_type.get(type_id, ()))
+
+    def find_by_tag(self, tag):
+        self.refresh()
+        return self.by_tag.get(tag)
+
+    def find_enemy_by_tag(self, tag):
+        self.refresh()
+        if self.enemy_by_tag is None:
+            self.enemy_by_tag = {enemy.tag: enemy for enemy in self.bot.known_enemy_units}
+        return self.enemy_by_tag.get(tag)
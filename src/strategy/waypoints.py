@@ -0,0 +1,91 @@
+from sc2.position import Point2
+
+from strategy import map_cache
+
+import numpy as np
+
+
+def ring_offsets(spacing, arcs, ring_count):
+    angles = np.arange(arcs) * (2.0 * np.pi / arcs)
+    directions = np.stack([np.cos(angles), np.sin(angles)], axis=-1)
+    radii = spacing * np.arange(1, ring_count + 1)
+    return radii[:, None, None] * directions[None, :, :]
+
+
+class WaypointTable():
+    def __init__(self, map_name, playable_area, spacing=10, arcs=8, cache_dir=map_cache.DEFAULT_CACHE_DIR,
+            max_extra_anchors=16):
+        self.map_name = map_name
+        self.playable_area = playable_area
+        self.spacing = spacing
+        self.arcs = arcs
+        self.cache_dir = cache_dir
+        # enough rings for a search from any anchor to sweep the whole map
+        self.ring_count = int(np.ceil(np.hypot(playable_area.width, playable_area.height) / spacing))
+        self.offsets = ring_offsets(spacing, arcs, self.ring_count)
+        self.anchors = {}
+        # anchors away from the known expansions, oldest first
+        self.max_extra_anchors = max_extra_anchors
+        self.extra_anchors = {}
+
+    def params(self):
+        return {
+            'playable_area': [float(value) for value in self.playable_area],
+            'spacing': self.spacing,
+            'arcs': self.arcs,
+        }
+
+    def points(self, anchors):
+        points = anchors[:, None, None, :] + self.offsets[None, :, :, :]
+        area = self.playable_area
+        valid = ((points[..., 0] >= area.x)
+                & (points[..., 0] < area.x + area.width)
+                & (points[..., 1] >= area.y)
+                & (points[..., 1] < area.y + area.height))
+        return (points, valid)
+
+    def add(self, anchors, points, valid):
+        for (anchor, anchor_points, anchor_valid) in zip(anchors, points, valid):
+            # waypoints off the playable area are dropped rather than clamped
+            # to the edge, so a ring is whatever is left of the circle
+            rings = [
+                [Point2((float(x), float(y))) for (x, y) in ring_points[ring_valid]]
+                for (ring_points, ring_valid) in zip(anchor_points, anchor_valid)
+            ]
+            self.anchors[self.key(anchor)] = rings
+
+    def key(self, position):
+        return (int(round(position[0])), int(round(position[1])))
+
+    def load_or_build(self, find_anchors):
+        cached = map_cache.load(self.cache_dir, self.map_name, 'waypoints', self.params())
+        if cached is not None:
+            self.add(cached['anchors'], cached['points'], cached['valid'])
+            return True
+        anchors = [(position[0], position[1]) for position in find_anchors()]
+        anchors = np.array(anchors, dtype=float).reshape(-1, 2)
+        (points, valid) = self.points(anchors)
+        self.add(anchors, points, valid)
+        map_cache.save(self.cache_dir, self.map_name, 'waypoints', self.params(), {
+            'anchors': anchors,
+            'points': points,
+            'valid': valid,
+        })
+        return False
+
+    def rings(self, position):
+        rings = self.anchors.get(self.key(position))
+        if rings is None:
+            # a base away from every known expansion, e.g. a floated terran building
+            anchor = np.array([(position[0], position[1])], dtype=float)
+            (points, valid) = self.points(anchor)
+            self.add(anchor, points, valid)
+            key = self.key(position)
+            rings = self.anchors[key]
+            # a job holds on to its own rings, so evicting them here is safe
+            self.extra_anchors[key] = None
+            if len(self.extra_anchors) > self.max_extra_anchors:
+                oldest = next(iter(self.extra_anchors))
+                del self.extra_anchors[oldest]
+                del self.anchors[oldest]
+        return rings
@@ -0,0 +1,34 @@
+from sc2.ids.ability_id import AbilityId
+
+from bench.fake_game import FakeGame
+from bench.scenarios import SCENARIOS
+from strategy.event_log import EventLog
+from strategy.protoss.cannon_rush import CannonRush
+
+import asyncio
+import random
+
+
+BUILDS = {AbilityId.PROTOSSBUILD_PYLON, AbilityId.PROTOSSBUILD_PHOTONCANNON}
+
+
+def test_rush_keeps_building_next_to_creep(tmp_path):
+    # the 5 to 12 ring around the hatchery is all creep in this scenario
+    scenario = next(scenario for scenario in SCENARIOS if scenario.name == 'rush-creep')
+    random.seed(0)
+    async def play():
+        with EventLog(str(tmp_path / 'events.jsonl.gz')) as log:
+            bot = CannonRush(log)
+            game = FakeGame(bot, scenario.game_info_proto())
+            await game.start(scenario.observation(0))
+            built = []
+            for iteration in range(4):
+                await game.step(scenario.observation(iteration + 1))
+                built.append([command for command in game.client.sent if command.ability in BUILDS])
+                game.client.sent.clear()
+            return built
+    built = asyncio.run(play())
+    assert all(len(commands) == 1 for commands in built)
+    for commands in built:
+        target = commands[0].target
+        assert not scenario.creep_grid[int(target.y), int(target.x)]
@@ -0,0 +1,129 @@
+from sc2.ids.ability_id import AbilityId
+from sc2.ids.unit_typeid import UnitTypeId
+
+from strategy.ledger import ProductionLedger
+
+
+PRODUCTS = {
+    UnitTypeId.PYLON: AbilityId.PROTOSSBUILD_PYLON,
+    UnitTypeId.PROBE: AbilityId.NEXUSTRAIN_PROBE,
+    UnitTypeId.ZEALOT: AbilityId.GATEWAYTRAIN_ZEALOT,
+}
+
+
+class Ability():
+    def __init__(self, ability_id):
+        self.id = ability_id
+
+
+class UnitData():
+    def __init__(self, ability_id):
+        self.creation_ability = Ability(ability_id)
+
+
+class GameData():
+    def __init__(self):
+        self.units = {unit_type.value: UnitData(ability) for (unit_type, ability) in PRODUCTS.items()}
+
+
+class Order():
+    def __init__(self, ability_id):
+        self.ability = Ability(ability_id)
+
+
+class Unit():
+    def __init__(self, tag, type_id, build_progress=1.0, orders=()):
+        self.tag = tag
+        self.type_id = type_id
+        self.build_progress = build_progress
+        self.orders = [Order(ability) for ability in orders]
+
+
+class Command():
+    def __init__(self, unit, ability):
+        self.unit = unit
+        self.ability = ability
+
+
+class State():
+    def __init__(self, game_loop):
+        self.game_loop = game_loop
+
+
+class UnitIndex():
+    def __init__(self, bot):
+        self.bot = bot
+
+    def find_by_tag(self, tag):
+        return next((unit for unit in self.bot.units if unit.tag == tag), None)
+
+
+class Bot():
+    # just what the ledger reads: the state, the units and the creation abilities
+    def __init__(self, units):
+        self._game_data = GameData()
+        self.unit_index = UnitIndex(self)
+        self.units = []
+        self.observe(0, units)
+
+    def observe(self, game_loop, units):
+        self.state = State(game_loop)
+        self.units = units
+
+
+def test_seed_counts_construction_and_orders():
+    bot = Bot([
+        Unit(1, UnitTypeId.NEXUS, orders=[AbilityId.NEXUSTRAIN_PROBE, AbilityId.NEXUSTRAIN_PROBE]),
+        Unit(2, UnitTypeId.PYLON, build_progress=0.5),
+    ])
+    ledger = ProductionLedger(bot)
+    ledger.seed()
+    assert ledger.pending(UnitTypeId.PROBE) == 2
+    assert ledger.pending(UnitTypeId.PYLON) == 1
+
+def test_construction_events_count_once_until_finished_or_destroyed():
+    bot = Bot([Unit(1, UnitTypeId.NEXUS)])
+    ledger = ProductionLedger(bot)
+    ledger.seed()
+    first = Unit(2, UnitTypeId.PYLON, build_progress=0.1)
+    second = Unit(3, UnitTypeId.PYLON, build_progress=0.1)
+    bot.observe(22, [bot.units[0], first, second])
+    ledger.construction_started(first)
+    ledger.construction_started(second)
+    # created fires for the same structure too, it must not count twice
+    ledger.unit_created(first)
+    assert ledger.pending(UnitTypeId.PYLON) == 2
+    ledger.unit_destroyed(second.tag)
+    assert ledger.pending(UnitTypeId.PYLON) == 1
+    bot.observe(44, [bot.units[0], Unit(2, UnitTypeId.PYLON, build_progress=1.0)])
+    assert ledger.pending(UnitTypeId.PYLON) == 0
+    # a finished unit's created event adds nothing
+    ledger.unit_created(bot.units[1])
+    assert ledger.pending(UnitTypeId.PYLON) == 0
+
+def test_issued_orders_reconcile_with_the_next_observation():
+    gateway = Unit(5, UnitTypeId.GATEWAY)
+    bot = Bot([gateway])
+    ledger = ProductionLedger(bot)
+    ledger.seed()
+    ledger.issued(Command(gateway, AbilityId.GATEWAYTRAIN_ZEALOT))
+    ledger.issued(Command(gateway, AbilityId.GATEWAYTRAIN_ZEALOT))
+    ledger.withdrawn(Command(gateway, AbilityId.GATEWAYTRAIN_ZEALOT))
+    assert ledger.pending(UnitTypeId.ZEALOT) == 1
+    # the order shows up on the producer, counted once
+    bot.observe(22, [Unit(5, UnitTypeId.GATEWAY, orders=[AbilityId.GATEWAYTRAIN_ZEALOT])])
+    assert ledger.pending(UnitTypeId.ZEALOT) == 1
+    # the zealot is out
+    bot.observe(44, [Unit(5, UnitTypeId.GATEWAY)])
+    assert ledger.pending(UnitTypeId.ZEALOT) == 0
+    assert ledger.orders == {}
+
+def test_destroyed_producer_drops_its_orders():
+    nexus = Unit(1, UnitTypeId.NEXUS, orders=[AbilityId.NEXUSTRAIN_PROBE])
+    bot = Bot([nexus])
+    ledger = ProductionLedger(bot)
+    ledger.seed()
+    assert ledger.pending(UnitTypeId.PROBE) == 1
+    bot.observe(22, [])
+    ledger.unit_destroyed(nexus.tag)
+    assert ledger.pending(UnitTypeId.PROBE) == 0
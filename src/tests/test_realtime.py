@@ -0,0 +1,39 @@
+from sc2 import Race, Difficulty
+from sc2.data import Result
+from sc2.maps import Map
+from sc2.player import Bot, Computer
+
+from bench.stand_in import StandInProcess
+from exe_bot.instance_pool import InstancePool
+from strategy.event_log import EventLog
+from strategy.protoss.voidray_swarm import VoidRaySwarm
+
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from pathlib import Path
+import asyncio
+
+
+def test_realtime_game_with_planner(tmp_path):
+    # the expand task runs on every step, so its pathing query shares the
+    # websocket with the game loop's own requests from the first step on
+    async def play(bot):
+        make_process = partial(StandInProcess, stand_in_args=['--scenario', 'early-10v10', '--game-steps', '40'])
+        async with InstancePool(size=1, make_process=make_process) as pool:
+            async with pool.lease() as instance:
+                return await instance.play(
+                        Map(Path('StandIn.SC2Map')),
+                        [Bot(Race.Protoss, bot), Computer(Race.Zerg, Difficulty.Hard)],
+                        realtime=True)
+
+    with EventLog(str(tmp_path / 'events.jsonl.gz')) as log, ThreadPoolExecutor(max_workers=2) as executor:
+        bot = VoidRaySwarm(log, executor=executor)
+        bot.MAP_CACHE_DIR = str(tmp_path)
+        bot.ITER_PER_PHASE = 1
+        for task in bot.scheduler.tasks:
+            if task.name == 'expand':
+                task.period = 1
+        result = asyncio.run(play(bot))
+    assert result == Result.Victory
+    assert bot.plans.failures == 0
+    assert bot.state.game_loop > 0
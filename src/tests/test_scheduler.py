@@ -0,0 +1,71 @@
+from strategy.scheduler import Scheduler, CRITICAL, HIGH, LOW, UNIT_CREATED, UNIT_DESTROYED
+from sc2.constants import NEXUS, PROBE
+
+import asyncio
+
+
+def recorder(runs, name):
+    async def action():
+        runs.append(name)
+    return action
+
+
+def test_deferred_task_runs_after_max_deferrals():
+    # a zero budget is always spent, so only critical and overdue tasks run
+    scheduler = Scheduler(budget=0.0, max_deferrals=3)
+    runs = []
+    scheduler.register('attack', recorder(runs, 'attack'), period=1, priority=CRITICAL)
+    scheduler.register('expand', recorder(runs, 'expand'), period=1, priority=LOW)
+    ran = []
+    async def steps():
+        for iteration in range(8):
+            await scheduler.run(iteration)
+            if runs[-1] == 'expand':
+                ran.append(iteration)
+    asyncio.run(steps())
+    # deferred on 0, 1 and 2, forced on 3, then the same again from 4
+    assert ran == [3, 7]
+    assert runs.count('attack') == 8
+    assert scheduler.deferred == 6
+
+def test_tasks_run_every_period_with_budget_to_spare():
+    scheduler = Scheduler(budget=None)
+    runs = []
+    scheduler.register('scout', recorder(runs, 'scout'), period=4, priority=HIGH)
+    async def steps():
+        for iteration in range(10):
+            await scheduler.run(iteration)
+    asyncio.run(steps())
+    assert runs == ['scout'] * 3
+
+def test_trigger_runs_task_before_its_period():
+    scheduler = Scheduler(budget=None)
+    runs = []
+    scheduler.register('build', recorder(runs, 'build'), period=32, priority=LOW, triggers=(UNIT_CREATED,))
+    async def steps():
+        await scheduler.run(0)
+        await scheduler.run(1)
+        scheduler.notify(UNIT_CREATED)
+        await scheduler.run(2)
+        await scheduler.run(3)
+    asyncio.run(steps())
+    assert runs == ['build', 'build']
+
+def test_trigger_ignores_unit_types_the_task_does_not_care_about():
+    scheduler = Scheduler(budget=None)
+    runs = []
+    scheduler.register('build', recorder(runs, 'build'), period=32, priority=LOW,
+            triggers=(UNIT_CREATED, UNIT_DESTROYED), trigger_types=(NEXUS,))
+    async def steps():
+        await scheduler.run(0)
+        # a stream of probes leaves the task on its period
+        for iteration in range(1, 4):
+            scheduler.notify(UNIT_CREATED, PROBE)
+            await scheduler.run(iteration)
+        scheduler.notify(UNIT_CREATED, NEXUS)
+        await scheduler.run(4)
+        # events without a unit type still wake it
+        scheduler.notify(UNIT_DESTROYED)
+        await scheduler.run(5)
+    asyncio.run(steps())
+    assert runs == ['build'] * 3
@@ -0,0 +1,50 @@
+from sc2.position import Point2
+
+from strategy.spatial_index import SpatialIndex
+
+import math
+import random
+
+
+class Located():
+    def __init__(self, x, y):
+        self.position = Point2((x, y))
+
+
+def distance(unit, position):
+    return math.hypot(unit.position.x - position.x, unit.position.y - position.y)
+
+def scatter(rng, count):
+    # clustered and spread out, so queries land both in and far from occupied cells
+    units = [Located(rng.uniform(-20, 180), rng.uniform(-20, 180)) for _ in range(count // 2)]
+    units += [Located(rng.gauss(60, 5), rng.gauss(90, 5)) for _ in range(count - count // 2)]
+    return units
+
+
+def test_k_nearest_matches_brute_force():
+    rng = random.Random(3)
+    units = scatter(rng, 400)
+    index = SpatialIndex(units, cell_size=8.0)
+    for _ in range(200):
+        position = Point2((rng.uniform(-60, 220), rng.uniform(-60, 220)))
+        k = rng.choice([1, 2, 5, 17, 400, 450])
+        expected = sorted(units, key=lambda unit: distance(unit, position))[:k]
+        found = index.k_nearest(position, k)
+        assert found == expected
+        assert index.nearest(position) is expected[0]
+
+def test_within_matches_brute_force():
+    rng = random.Random(5)
+    units = scatter(rng, 400)
+    index = SpatialIndex(units, cell_size=8.0)
+    for _ in range(200):
+        position = Point2((rng.uniform(-60, 220), rng.uniform(-60, 220)))
+        radius = rng.uniform(0, 40)
+        expected = {id(unit) for unit in units if distance(unit, position) <= radius}
+        assert {id(unit) for unit in index.within(position, radius)} == expected
+
+def test_empty_index():
+    index = SpatialIndex([])
+    assert index.k_nearest(Point2((0, 0)), 3) == []
+    assert index.nearest(Point2((0, 0))) is None
+    assert index.within(Point2((0, 0)), 10) == []
@@ -0,0 +1,72 @@
+from sc2.position import Point2
+
+from strategy.targeting import TargetAssigner
+
+import math
+import random
+
+
+class Attacker():
+    def __init__(self, tag, x, y, air=True, ground=True, dps=10.0):
+        self.tag = tag
+        self.position = Point2((x, y))
+        self.can_attack_air = air
+        self.can_attack_ground = ground
+        self.ground_dps = dps if ground else 0.0
+        self.air_dps = dps if air else 0.0
+
+
+class Enemy():
+    def __init__(self, tag, x, y, vitality, flying=False, armed=True):
+        self.tag = tag
+        self.position = Point2((x, y))
+        self.is_flying = flying
+        self.can_attack = armed
+        self.health = vitality
+        self.shield = 0.0
+        self.health_max = vitality
+        self.shield_max = 0.0
+
+
+def counts(assignment):
+    found = {}
+    for enemy in assignment.values():
+        found[enemy.tag] = found.get(enemy.tag, 0) + 1
+    return found
+
+def capacities(assigner, attackers, enemies):
+    capacity = assigner.capacity(assigner.features(attackers, enemies))
+    return {enemy.tag: int(limit) for (enemy, limit) in zip(enemies, capacity)}
+
+
+def test_assign_respects_capacity():
+    rng = random.Random(11)
+    assigner = TargetAssigner(max_per_target=4)
+    attackers = [Attacker(tag, rng.uniform(0, 30), rng.uniform(0, 30)) for tag in range(40)]
+    # every target close to the same corner, so greedy choices all collide
+    enemies = [Enemy(100 + tag, rng.uniform(0, 5), rng.uniform(0, 5), rng.choice([20.0, 60.0, 500.0])) for tag in range(25)]
+    limits = capacities(assigner, attackers, enemies)
+    assert sum(limits.values()) >= len(attackers)
+    assignment = assigner.assign(attackers, enemies)
+    assert len(assignment) == len(attackers)
+    for (tag, count) in counts(assignment).items():
+        assert count <= limits[tag]
+
+def test_surplus_attackers_pile_on_in_rounds():
+    assigner = TargetAssigner(max_per_target=2)
+    attackers = [Attacker(tag, tag, 0) for tag in range(9)]
+    enemies = [Enemy(100, 0, 10, 5.0), Enemy(101, 8, 10, 500.0)]
+    limits = capacities(assigner, attackers, enemies)
+    rounds = math.ceil(len(attackers) / sum(limits.values()))
+    assignment = assigner.assign(attackers, enemies)
+    # nobody is left idle, and no target takes more than its share of each round
+    assert len(assignment) == len(attackers)
+    for (tag, count) in counts(assignment).items():
+        assert count <= limits[tag] * rounds
+
+def test_unreachable_targets_are_never_assigned():
+    assigner = TargetAssigner()
+    attackers = [Attacker(0, 0, 0, air=False), Attacker(1, 1, 0, air=False), Attacker(2, 2, 0, ground=False)]
+    enemies = [Enemy(100, 5, 5, 100.0, flying=True)]
+    assignment = assigner.assign(attackers, enemies)
+    assert set(assignment) == {2}
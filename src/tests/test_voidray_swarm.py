@@ -0,0 +1,25 @@
+from sc2.ids.ability_id import AbilityId
+
+from bench.fake_game import FakeGame
+from bench.scenarios import SCENARIOS
+from strategy.event_log import EventLog
+from strategy.protoss.voidray_swarm import VoidRaySwarm
+
+import asyncio
+
+
+def test_pylons_fall_back_to_a_search_when_the_layout_runs_out(tmp_path):
+    # the scenario is over its supply cap, so a pylon is due
+    scenario = next(scenario for scenario in SCENARIOS if scenario.name == 'early-10v10')
+    async def play():
+        with EventLog(str(tmp_path / 'events.jsonl.gz')) as log:
+            bot = VoidRaySwarm(log)
+            bot.MAP_CACHE_DIR = str(tmp_path)
+            game = FakeGame(bot, scenario.game_info_proto())
+            await game.start(scenario.observation(0))
+            bot.layout.base_pylons = [[] for _ in bot.layout.base_pylons]
+            await game.step(scenario.observation(1))
+            assert bot.supply_used > bot.supply_cap
+            return game.client.sent
+    sent = asyncio.run(play())
+    assert [command.ability for command in sent].count(AbilityId.PROTOSSBUILD_PYLON) == 1